@@ -5,6 +5,11 @@
 #              are available and how they're implemented.
 #              Don't modify the contents of this file.
 
+import pickle
+import secrets
+import struct
+from bisect import bisect_left, bisect_right
+
 
 # -------------- Used by both HashMaps (SC & OA)  -------------- #
 
@@ -96,6 +101,380 @@ def hash_function_2(key: str) -> int:
     return hash
 
 
+# ---------- Additional hash functions (same signature)  ---------- #
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_MASK_64 = 0xFFFFFFFFFFFFFFFF
+
+_FNV_OFFSET_64 = 0xCBF29CE484222325
+_FNV_PRIME_64 = 0x100000001B3
+
+_XXH_PRIME64_1 = 0x9E3779B185EBCA87
+_XXH_PRIME64_2 = 0xC2B2AE3D27D4EB4F
+_XXH_PRIME64_3 = 0x165667B19E3779F9
+_XXH_PRIME64_4 = 0x85EBCA77C2B2AE63
+_XXH_PRIME64_5 = 0x27D4EB2F165667C5
+
+
+def _key_bytes(key) -> bytes:
+    """Return the bytes that get hashed for a key (UTF-8 for strings)."""
+    if isinstance(key, str):
+        return key.encode('utf-8')
+    if isinstance(key, (bytes, bytearray)):
+        return bytes(key)
+    return str(key).encode('utf-8')
+
+
+def _rotl64(value: int, bits: int) -> int:
+    """Rotate a 64-bit integer left by the given number of bits."""
+    return ((value << bits) | (value >> (64 - bits))) & _MASK_64
+
+
+def hash_function_fnv1a(key: str) -> int:
+    """64-bit FNV-1a hash; unlike hash_function_1 it does not collide on anagrams"""
+    hash = _FNV_OFFSET_64
+    for byte in _key_bytes(key):
+        hash = ((hash ^ byte) * _FNV_PRIME_64) & _MASK_64
+    return hash
+
+
+def _xxh64_round(accumulator: int, lane: int) -> int:
+    """One XXH64 accumulator round."""
+    accumulator = (accumulator + lane * _XXH_PRIME64_2) & _MASK_64
+    return (_rotl64(accumulator, 31) * _XXH_PRIME64_1) & _MASK_64
+
+
+def _xxh64_merge(hash: int, accumulator: int) -> int:
+    """Merge one XXH64 accumulator into the hash."""
+    hash ^= _xxh64_round(0, accumulator)
+    return (hash * _XXH_PRIME64_1 + _XXH_PRIME64_4) & _MASK_64
+
+
+def hash_function_xxh64(key: str, seed: int = 0) -> int:
+    """64-bit xxHash (XXH64); consumes the key 8 bytes at a time instead of per character"""
+    data = _key_bytes(key)
+    length = len(data)
+    offset = 0
+
+    if length >= 32:
+        v1 = (seed + _XXH_PRIME64_1 + _XXH_PRIME64_2) & _MASK_64
+        v2 = (seed + _XXH_PRIME64_2) & _MASK_64
+        v3 = seed & _MASK_64
+        v4 = (seed - _XXH_PRIME64_1) & _MASK_64
+        while offset + 32 <= length:
+            v1 = _xxh64_round(v1, int.from_bytes(data[offset:offset + 8], 'little'))
+            v2 = _xxh64_round(v2, int.from_bytes(data[offset + 8:offset + 16], 'little'))
+            v3 = _xxh64_round(v3, int.from_bytes(data[offset + 16:offset + 24], 'little'))
+            v4 = _xxh64_round(v4, int.from_bytes(data[offset + 24:offset + 32], 'little'))
+            offset += 32
+        hash = (_rotl64(v1, 1) + _rotl64(v2, 7) + _rotl64(v3, 12) + _rotl64(v4, 18)) & _MASK_64
+        hash = _xxh64_merge(hash, v1)
+        hash = _xxh64_merge(hash, v2)
+        hash = _xxh64_merge(hash, v3)
+        hash = _xxh64_merge(hash, v4)
+    else:
+        hash = (seed + _XXH_PRIME64_5) & _MASK_64
+
+    hash = (hash + length) & _MASK_64
+
+    while offset + 8 <= length:
+        hash ^= _xxh64_round(0, int.from_bytes(data[offset:offset + 8], 'little'))
+        hash = (_rotl64(hash, 27) * _XXH_PRIME64_1 + _XXH_PRIME64_4) & _MASK_64
+        offset += 8
+
+    if offset + 4 <= length:
+        hash ^= (int.from_bytes(data[offset:offset + 4], 'little') * _XXH_PRIME64_1) & _MASK_64
+        hash = (_rotl64(hash, 23) * _XXH_PRIME64_2 + _XXH_PRIME64_3) & _MASK_64
+        offset += 4
+
+    while offset < length:
+        hash ^= (data[offset] * _XXH_PRIME64_5) & _MASK_64
+        hash = (_rotl64(hash, 11) * _XXH_PRIME64_1) & _MASK_64
+        offset += 1
+
+    # Final avalanche
+    hash ^= hash >> 33
+    hash = (hash * _XXH_PRIME64_2) & _MASK_64
+    hash ^= hash >> 29
+    hash = (hash * _XXH_PRIME64_3) & _MASK_64
+    hash ^= hash >> 32
+    return hash
+
+
+def _sip_round(v0: int, v1: int, v2: int, v3: int) -> tuple:
+    """One SipRound over the four 64-bit state words."""
+    v0 = (v0 + v1) & _MASK_64
+    v1 = _rotl64(v1, 13) ^ v0
+    v0 = _rotl64(v0, 32)
+    v2 = (v2 + v3) & _MASK_64
+    v3 = _rotl64(v3, 16) ^ v2
+    v0 = (v0 + v3) & _MASK_64
+    v3 = _rotl64(v3, 21) ^ v0
+    v2 = (v2 + v1) & _MASK_64
+    v1 = _rotl64(v1, 17) ^ v2
+    v2 = _rotl64(v2, 32)
+    return v0, v1, v2, v3
+
+
+def siphash24(key: str, k0: int = 0, k1: int = 0) -> int:
+    """
+    SipHash-2-4 of the key under the 128-bit secret (k0, k1).
+    Without knowing the secret an attacker cannot construct colliding keys.
+    """
+    data = _key_bytes(key)
+    length = len(data)
+
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    # The last block carries the remaining bytes and the length in its top byte
+    end = length - length % 8
+    offset = 0
+    while offset <= end:
+        if offset < end:
+            block = int.from_bytes(data[offset:offset + 8], 'little')
+        else:
+            block = int.from_bytes(data[offset:], 'little') | ((length & 0xFF) << 56)
+        v3 ^= block
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+        v0 ^= block
+        offset += 8
+
+    v2 ^= 0xFF
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+def keyed_siphash(k0: int, k1: int) -> callable:
+    """Return a SipHash-2-4 hash function bound to the secret (k0, k1)."""
+    def hash_function_siphash(key: str) -> int:
+        return siphash24(key, k0, k1)
+    return hash_function_siphash
+
+
+def random_siphash() -> callable:
+    """
+    Return a SipHash-2-4 hash function bound to a new random secret, so every
+    map that calls this gets a hash function of its own that nobody can predict.
+    """
+    return keyed_siphash(secrets.randbits(64), secrets.randbits(64))
+
+
+class VectorizedFNV1a:
+    """
+    FNV-1a hash function that can also hash a whole batch of keys at once.
+    Calling it hashes one key exactly like hash_function_fnv1a. hash_many()
+    hashes a sequence of keys; when NumPy is installed, the byte loop runs
+    over all keys at the same time, otherwise it falls back to one key at a time.
+    """
+
+    def __call__(self, key: str) -> int:
+        """Hash a single key."""
+        return hash_function_fnv1a(key)
+
+    def hash_many(self, keys) -> list:
+        """Return the list of hashes for a sequence of keys."""
+        if numpy is None:
+            return [hash_function_fnv1a(key) for key in keys]
+
+        encoded = [_key_bytes(key) for key in keys]
+        if not encoded:
+            return []
+        lengths = numpy.fromiter((len(data) for data in encoded), dtype=numpy.int64, count=len(encoded))
+        width = int(lengths.max())
+
+        # One row per key, padded with zeros; the padding bytes are masked out below
+        matrix = numpy.zeros((len(encoded), max(width, 1)), dtype=numpy.uint8)
+        for row, data in enumerate(encoded):
+            matrix[row, :len(data)] = numpy.frombuffer(data, dtype=numpy.uint8)
+
+        hashes = numpy.full(len(encoded), _FNV_OFFSET_64, dtype=numpy.uint64)
+        prime = numpy.uint64(_FNV_PRIME_64)
+        with numpy.errstate(over='ignore'):
+            for column in range(width):
+                active = lengths > column
+                mixed = (hashes ^ matrix[:, column].astype(numpy.uint64)) * prime
+                hashes = numpy.where(active, mixed, hashes)
+        return hashes.tolist()
+
+
+hash_function_fnv1a_vectorized = VectorizedFNV1a()
+
+
+# ------------- Statistics (used by both HashMaps)  ------------- #
+
+class OperationCounters:
+    """
+    Counters a HashMap updates while it runs when statistics are enabled
+    """
+
+    __slots__ = ('hits', 'misses', 'resizes', 'resize_seconds')
+
+    def __init__(self) -> None:
+        """Initialize all counters to zero."""
+        self.hits = 0
+        self.misses = 0
+        self.resizes = 0
+        self.resize_seconds = 0.0
+
+
+def length_summary(histogram: DynamicArray) -> tuple:
+    """
+    Given a histogram where index n holds how many chains/probes have length n,
+    return (mean, max, p99) of the non-zero lengths, or (0, 0, 0) if there are none.
+    """
+    total = count = longest = 0
+    length = 1
+    while length < histogram.length():
+        if histogram[length]:
+            count += histogram[length]
+            total += length * histogram[length]
+            longest = length
+        length += 1
+    if count == 0:
+        return 0, 0, 0
+
+    # The 99th percentile is the smallest length that covers 99% of the counted items
+    threshold = 0.99 * count
+    covered = 0
+    length = 1
+    while length < histogram.length():
+        covered += histogram[length]
+        if covered >= threshold:
+            break
+        length += 1
+    return total / count, longest, length
+
+
+def histogram_add(histogram: DynamicArray, length: int) -> None:
+    """Count one more item of the given length, growing the histogram as needed."""
+    while histogram.length() <= length:
+        histogram.append(0)
+    histogram[length] = histogram[length] + 1
+
+
+# ----------- Serialization (used by both HashMaps)  ----------- #
+
+# A dump is a header followed by one record per key/value pair:
+#   header - magic, format version, capacity, size, length of the hash function id, the id
+#   record - key length, value length, UTF-8 key, pickled value
+# All integers are little-endian.
+DUMP_MAGIC = b'HMAP'
+DUMP_VERSION = 1
+
+_DUMP_HEADER = struct.Struct('<4sHQQH')
+_DUMP_RECORD = struct.Struct('<II')
+
+# Records are collected into chunks of about this many bytes before being written
+_DUMP_CHUNK = 1 << 16
+
+
+# Ids of the hash functions of this module, by which a dump finds them again. The
+# vectorized FNV-1a is an instance, so it cannot go by its qualified name.
+_HASH_FUNCTION_IDS = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+    'hash_function_fnv1a': hash_function_fnv1a,
+    'hash_function_xxh64': hash_function_xxh64,
+    'hash_function_fnv1a_vectorized': hash_function_fnv1a_vectorized,
+}
+
+
+def hash_function_id(function) -> str:
+    """
+    Return the id stored in a dump to identify a hash function: its name in
+    _HASH_FUNCTION_IDS, or its qualified name for any other function.
+    """
+    for function_id, registered in _HASH_FUNCTION_IDS.items():
+        if registered is function:
+            return function_id
+    return getattr(function, '__qualname__', None) or type(function).__qualname__
+
+
+def hash_function_from_id(function_id: str) -> callable:
+    """
+    Return the hash function of this module with the given id.
+    The secret of a keyed SipHash is never written to a dump, so one comes back with
+    a new random secret; loading hashes every key again anyway.
+    Raises ValueError for ids of functions defined elsewhere; those must be passed to load().
+    """
+    if function_id == hash_function_id(keyed_siphash(0, 0)):
+        return random_siphash()
+    if function_id in _HASH_FUNCTION_IDS:
+        return _HASH_FUNCTION_IDS[function_id]
+    raise ValueError(f"unknown hash function {function_id!r}; pass it to load()")
+
+
+def write_dump(fileobj, capacity: int, pairs, size: int, function) -> None:
+    """
+    Write a header and one record per (key, value) in pairs to the binary file object.
+    pairs may be any iterable; records are encoded and written in chunks as they come,
+    so no second copy of the map is built in memory.
+    """
+    function_id = hash_function_id(function).encode('utf-8')
+    fileobj.write(_DUMP_HEADER.pack(DUMP_MAGIC, DUMP_VERSION, capacity, size, len(function_id)))
+    fileobj.write(function_id)
+
+    chunk = bytearray()
+    for key, value in pairs:
+        encoded_key = key.encode('utf-8')
+        encoded_value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        chunk += _DUMP_RECORD.pack(len(encoded_key), len(encoded_value))
+        chunk += encoded_key
+        chunk += encoded_value
+        if len(chunk) >= _DUMP_CHUNK:
+            fileobj.write(chunk)
+            chunk = bytearray()
+    fileobj.write(chunk)
+
+
+def _read_exactly(fileobj, length: int) -> bytes:
+    """
+    Read exactly length bytes from the binary file object.
+    Raises ValueError if the file ends first.
+    """
+    data = fileobj.read(length)
+    if len(data) != length:
+        raise ValueError("truncated dump")
+    return data
+
+
+def read_dump_header(fileobj) -> tuple:
+    """
+    Read the header written by write_dump() and return (capacity, size, hash function id).
+    Raises ValueError if the file object does not start with a dump of this version,
+    or ends before the header does.
+    """
+    magic, version, capacity, size, id_length = _DUMP_HEADER.unpack(
+        _read_exactly(fileobj, _DUMP_HEADER.size))
+    if magic != DUMP_MAGIC or version != DUMP_VERSION:
+        raise ValueError(f"not a hash map dump of version {DUMP_VERSION}")
+    return capacity, size, _read_exactly(fileobj, id_length).decode('utf-8')
+
+
+def read_dump_records(fileobj, size: int):
+    """
+    Yield the size (key, value) records that follow the header, in the order they were written.
+    Raises ValueError if the file object ends before the last record does.
+    """
+    unpack = _DUMP_RECORD.unpack
+    record_size = _DUMP_RECORD.size
+    for _ in range(size):
+        key_length, value_length = unpack(_read_exactly(fileobj, record_size))
+        key = _read_exactly(fileobj, key_length).decode('utf-8')
+        yield key, pickle.loads(_read_exactly(fileobj, value_length))
+
+
 # --------- For use in Separate Chaining (SC) HashMap  --------- #
 
 class SLNode:
@@ -103,11 +482,19 @@ class SLNode:
     Singly Linked List node for use in a hash map
     """
 
-    def __init__(self, key: str, value: object, next: "SLNode" = None) -> None:
-        """Initialize node given a key and value."""
+    # Nodes only ever hold these attributes, so we skip the per-instance __dict__
+    __slots__ = ('key', 'value', 'next', 'hash')
+
+    def __init__(self, key: str, value: object, next: "SLNode" = None,
+                 hash: int = None) -> None:
+        """
+        Initialize node given a key and value.
+        The full hash of the key may be stored so it never has to be recomputed.
+        """
         self.key = key
         self.value = value
         self.next = next
+        self.hash = hash
 
     def __str__(self) -> str:
         """Override string method to provide more readable output."""
@@ -141,7 +528,7 @@ class LinkedListIterator:
 class LinkedList:
     """
     Class implementing a Singly Linked List
-    Supported methods are: insert, remove, contains, length, iterator
+    Supported methods are: insert, push, remove, pop, contains, length, iterator
     """
 
     def __init__(self) -> None:
@@ -168,20 +555,33 @@ class LinkedList:
         """Return an iterator for the list, starting at the head."""
         return LinkedListIterator(self._head)
 
-    def insert(self, key: str, value: object) -> None:
-        """Insert new node at front of the list."""
-        self._head = SLNode(key, value, self._head)
+    def insert(self, key: str, value: object, hash: int = None) -> SLNode:
+        """Insert new node at front of the list and return it."""
+        self._head = SLNode(key, value, self._head, hash)
         self._size += 1
+        return self._head
 
-    def remove(self, key: str) -> bool:
+    def push(self, node: SLNode) -> SLNode:
+        """
+        Link an existing node (e.g. one taken from another list) in at the front
+        of the list and return it. The node keeps its identity and any extra attributes.
+        """
+        node.next = self._head
+        self._head = node
+        self._size += 1
+        return node
+
+    def remove(self, key: str, hash: int = None) -> bool:
         """
         Remove first node with matching key.
+        If hash is given, nodes with a different stored hash are skipped
+        without comparing keys.
         Return True if removal was successful, False otherwise.
         """
         previous, node = None, self._head
         while node:
 
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 if previous:
                     previous.next = node.next
                 else:
@@ -192,11 +592,35 @@ class LinkedList:
             previous, node = node, node.next
         return False
 
-    def contains(self, key: str) -> SLNode:
-        """Return node with matching key, or None if no match"""
+    def pop(self, key: str, hash: int = None) -> SLNode:
+        """
+        Remove first node with matching key and return it, or None if no match.
+        If hash is given, nodes with a different stored hash are skipped
+        without comparing keys.
+        """
+        previous, node = None, self._head
+        while node:
+
+            if (hash is None or node.hash == hash) and node.key == key:
+                if previous:
+                    previous.next = node.next
+                else:
+                    self._head = node.next
+                self._size -= 1
+                return node
+
+            previous, node = node, node.next
+        return None
+
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """
+        Return node with matching key, or None if no match.
+        If hash is given, nodes with a different stored hash are skipped
+        without comparing keys.
+        """
         node = self._head
         while node:
-            if node.key == key:
+            if (hash is None or node.hash == hash) and node.key == key:
                 return node
             node = node.next
         return node
@@ -206,14 +630,130 @@ class LinkedList:
         return self._size
 
 
+class TreeBucket:
+    """
+    Bucket for a long separate chaining chain, standing in for the tree bins of Java's HashMap:
+    the nodes are kept in a list sorted by hash, so a key is found by binary search instead of
+    a walk. While every key in the bucket is a str, nodes with equal hashes are also sorted by
+    key, so even keys with the same full hash (e.g. anagrams under hash_function_1) are found
+    by binary search. Keys of any other type may not be orderable, so once one is added,
+    nodes with equal hashes stay in insertion order and are compared one by one, like Java's
+    tie-breaking. Supports the same methods as LinkedList; the hash must always be given.
+    """
+
+    __slots__ = ('_sort_keys', '_nodes', '_by_key')
+
+    def __init__(self, nodes=()) -> None:
+        """
+        Initialize the bucket with the given nodes (e.g. a LinkedList that grew too long).
+        The nodes themselves are kept, so references to them stay valid.
+        """
+        self._nodes = list(nodes)
+        self._by_key = all(type(node.key) is str for node in self._nodes)
+        if self._by_key:
+            self._nodes.sort(key=lambda node: (node.hash, node.key))
+            self._sort_keys = [(node.hash, node.key) for node in self._nodes]
+        else:
+            self._nodes.sort(key=lambda node: node.hash)
+            self._sort_keys = [node.hash for node in self._nodes]
+        for node in self._nodes:
+            node.next = None
+
+    def __str__(self) -> str:
+        """Override string method to provide more readable output."""
+        return 'TREE [' + ' -> '.join(str(node) for node in self._nodes) + ']'
+
+    def __iter__(self):
+        """Return an iterator over the nodes in sorted order."""
+        return iter(self._nodes)
+
+    def _find(self, key: str, hash: int) -> int:
+        """Return the position of the node with matching key, or -1 if no match."""
+        if self._by_key:
+            # Every key in the bucket is a str, so a key of any other type is not here
+            if type(key) is not str:
+                return -1
+            sort_key = (hash, key)
+            position = bisect_left(self._sort_keys, sort_key)
+            if position < len(self._sort_keys) and self._sort_keys[position] == sort_key:
+                return position
+            return -1
+
+        # Only the hashes are sorted; we compare the keys of the nodes sharing this hash
+        position = bisect_left(self._sort_keys, hash)
+        while position < len(self._sort_keys) and self._sort_keys[position] == hash:
+            if self._nodes[position].key == key:
+                return position
+            position += 1
+        return -1
+
+    def insert(self, key: str, value: object, hash: int = None) -> SLNode:
+        """Insert a new node in sorted position and return it."""
+        return self.push(SLNode(key, value, None, hash))
+
+    def push(self, node: SLNode) -> SLNode:
+        """Insert an existing node in sorted position and return it."""
+        if self._by_key and type(node.key) is not str:
+            # From now on only the hashes are kept sorted
+            self._by_key = False
+            self._sort_keys = [node.hash for node in self._nodes]
+
+        sort_key = (node.hash, node.key) if self._by_key else node.hash
+        position = bisect_right(self._sort_keys, sort_key)
+        self._sort_keys.insert(position, sort_key)
+        self._nodes.insert(position, node)
+        node.next = None
+        return node
+
+    def remove(self, key: str, hash: int = None) -> bool:
+        """
+        Remove the node with matching key.
+        Return True if removal was successful, False otherwise.
+        """
+        return self.pop(key, hash) is not None
+
+    def pop(self, key: str, hash: int = None) -> SLNode:
+        """Remove the node with matching key and return it, or None if no match."""
+        position = self._find(key, hash)
+        if position == -1:
+            return None
+        del self._sort_keys[position]
+        return self._nodes.pop(position)
+
+    def contains(self, key: str, hash: int = None) -> SLNode:
+        """Return node with matching key, or None if no match."""
+        position = self._find(key, hash)
+        if position == -1:
+            return None
+        return self._nodes[position]
+
+    def length(self) -> int:
+        """Return the number of nodes in the bucket."""
+        return len(self._nodes)
+
+    def to_linked_list(self) -> LinkedList:
+        """Return a LinkedList holding the same nodes, in the same order."""
+        linked_list = LinkedList()
+        for node in reversed(self._nodes):
+            linked_list.push(node)
+        return linked_list
+
+
 # ---------- For use in Open Addressing (OA) HashMap  ---------- #
 
 class HashEntry:
 
-    def __init__(self, key: str, value: object) -> None:
-        """Initialize an entry for use in a hash map."""
+    # Entries only ever hold these attributes, so we skip the per-instance __dict__
+    __slots__ = ('key', 'value', 'hash', 'is_tombstone')
+
+    def __init__(self, key: str, value: object, hash: int = None) -> None:
+        """
+        Initialize an entry for use in a hash map.
+        The full hash of the key may be stored so it never has to be recomputed.
+        """
         self.key = key
         self.value = value
+        self.hash = hash
 
         # Set this value to True when you "delete" a HashEntry
         self.is_tombstone = False
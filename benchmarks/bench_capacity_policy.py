@@ -0,0 +1,107 @@
+# Description: Compares the two capacity policies of the separate chaining and open
+#              addressing HashMaps: prime capacities with hash % capacity (and quadratic
+#              probing), and power-of-two capacities with Fibonacci hashing (and
+#              triangular probing). It times the raw index computations, picking the next
+#              table size on a resize, and put/get on maps of each policy. Each put/get
+#              time is the best of several runs.
+#
+# Usage:       python benchmarks/bench_capacity_policy.py [number_of_keys] [runs]
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_fnv1a, hash_function_2
+
+
+POLICIES = ('prime', 'power_of_two')
+
+MAPS = (
+    ('sc', hash_map_sc.HashMap),
+    ('oa', hash_map_oa.HashMap),
+)
+
+HASH_FUNCTIONS = (
+    ('hash_function_2', hash_function_2),
+    ('fnv1a', hash_function_fnv1a),
+)
+
+
+def make_keys(count: int) -> list:
+    """Return count distinct random alphanumeric keys."""
+    rng = random.Random(0)
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    keys = set()
+    while len(keys) < count:
+        keys.add(''.join(rng.choice(alphabet) for _ in range(10)))
+    return list(keys)
+
+
+def best_of(runs: int, work) -> float:
+    """Return the shortest time out of runs calls of work()."""
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        work()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_index(hashes: list, runs: int) -> None:
+    """Time reducing 64-bit hashes to a bucket index by modulo and by Fibonacci hashing."""
+    prime, power_of_two = 1048573, 1 << 20
+    word_mask, fibonacci, shift = 0xFFFFFFFFFFFFFFFF, 0x9E3779B97F4A7C15, 64 - 20
+
+    modulo = best_of(runs, lambda: [hash % prime for hash in hashes])
+    fibonacci_time = best_of(runs, lambda: [((hash * fibonacci) & word_mask) >> shift for hash in hashes])
+    print(f"index of {len(hashes)} hashes: modulo {modulo:.4f}s, fibonacci {fibonacci_time:.4f}s")
+
+
+def measure_table_size(runs: int) -> None:
+    """Time finding the capacity for every doubling from 11 up to about 2^26 buckets."""
+    prime_map = hash_map_sc.HashMap(11, hash_function_2)
+    power_map = hash_map_sc.HashMap(11, hash_function_2, capacity_policy='power_of_two')
+    capacities = [11 << shift for shift in range(22)]
+
+    prime = best_of(runs, lambda: [prime_map._table_size(capacity) for capacity in capacities])
+    power = best_of(runs, lambda: [power_map._table_size(capacity) for capacity in capacities])
+    print(f"table size for {len(capacities)} doublings: prime {prime * 1000:.3f}ms, "
+          f"power of two {power * 1000:.3f}ms")
+
+
+def measure_maps(keys: list, runs: int) -> None:
+    """Time put of every key into a new map, then get of every key, for each map and policy."""
+    print(f"\n{'map':<5}{'hash function':<18}{'policy':<15}{'put':>10}{'get':>10}{'capacity':>10}")
+    for map_name, map_class in MAPS:
+        for function_name, function in HASH_FUNCTIONS:
+            for policy in POLICIES:
+                def fill():
+                    hash_map = map_class(11, function, capacity_policy=policy)
+                    for index, key in enumerate(keys):
+                        hash_map.put(key, index)
+                    return hash_map
+
+                hash_map = fill()
+                put = best_of(runs, fill)
+                get = best_of(runs, lambda: [hash_map.get(key) for key in keys])
+                print(f"{map_name:<5}{function_name:<18}{policy:<15}{put:>9.3f}s{get:>9.3f}s"
+                      f"{hash_map.get_capacity():>10}")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    keys = make_keys(count)
+    measure_index([hash_function_fnv1a(key) for key in keys], runs)
+    measure_table_size(runs)
+    measure_maps(keys, runs)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+# Description: Multi-threaded throughput of ConcurrentHashMap compared with the
+#              separate chaining HashMap wrapped in one global lock. Every thread runs
+#              the same mix of get and put calls on a shared, pre-filled map.
+#              On a GIL build the threads mostly take turns; on a free-threaded
+#              (no-GIL) build, lock striping and lock-free reads let them run in parallel.
+#
+# Usage:       python benchmarks/bench_concurrent.py [operations_per_thread]
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from a6_include import hash_function_fnv1a
+from concurrent_hash_map import ConcurrentHashMap
+from hash_map_sc import HashMap
+
+
+class GlobalLockHashMap:
+    """
+    The separate chaining HashMap behind one lock, the way callers share it today
+    """
+
+    def __init__(self, capacity: int, function) -> None:
+        self._map = HashMap(capacity, function)
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: object) -> None:
+        with self._lock:
+            self._map.put(key, value)
+
+    def get(self, key: str) -> object:
+        with self._lock:
+            return self._map.get(key)
+
+
+KEY_SPACE = 50000
+READ_RATIO = 0.9
+
+
+def worker(hash_map, operations: int, seed: int, barrier: threading.Barrier) -> None:
+    """Run a read-heavy mix of get and put calls on random keys."""
+    rng = random.Random(seed)
+    keys = ['key' + str(rng.randrange(KEY_SPACE)) for _ in range(operations)]
+    reads = [rng.random() < READ_RATIO for _ in range(operations)]
+    barrier.wait()
+    for key, read in zip(keys, reads):
+        if read:
+            hash_map.get(key)
+        else:
+            hash_map.put(key, 1)
+
+
+def measure(factory, threads: int, operations: int) -> float:
+    """Return total operations per second across the given number of threads."""
+    hash_map = factory()
+    for i in range(KEY_SPACE):
+        hash_map.put('key' + str(i), 0)
+
+    barrier = threading.Barrier(threads + 1)
+    workers = [threading.Thread(target=worker, args=(hash_map, operations, seed, barrier))
+               for seed in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return threads * operations / (time.perf_counter() - start)
+
+
+def main() -> None:
+    operations = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs")
+
+    factories = (
+        ('global lock', lambda: GlobalLockHashMap(KEY_SPACE, hash_function_fnv1a)),
+        ('striped', lambda: ConcurrentHashMap(KEY_SPACE, hash_function_fnv1a, stripes=64)),
+    )
+    print(f"{'threads':>8}" + ''.join(f"{name:>16}" for name, _ in factories))
+    for threads in (1, 2, 4, 8):
+        row = f"{threads:>8}"
+        for _, factory in factories:
+            row += f"{measure(factory, threads, operations):>16.0f}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Description: Replays hash-flooding attacks against both HashMaps. The attack keys are
+#              crafted so that every one of them has the same hash: anagrams under
+#              hash_function_1, and keys with equal position-weighted sums under
+#              hash_function_2. Each attack is timed (put every key, then get every key)
+#              on an unprotected map and on a map created with flood_threshold, which
+#              switches to SipHash with a random secret and rehashes in place once it
+#              notices the attack. The separate chaining map is also shown with
+#              treeify_threshold=0, i.e. with plain LinkedList chains.
+#
+# Usage:       python benchmarks/bench_flooding.py [number_of_keys] [flood_threshold]
+
+import itertools
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import hash_function_1, hash_function_2
+
+
+def anagram_keys(count: int) -> list:
+    """Return count distinct permutations of the same letters; hash_function_1 maps them all together."""
+    return [''.join(letters) for letters in itertools.islice(itertools.permutations('abcdefghijkl'), count)]
+
+
+def weighted_sum_keys(count: int) -> list:
+    """
+    Return count distinct 5 character keys whose sum of (position + 1) * ord(character)
+    is the same, so hash_function_2 maps them all together. The last four characters
+    are letters and the first one makes up the difference.
+    """
+    total = 6000
+    keys = []
+    for letters in itertools.product('abcdefghijklmnopqrstuvwxyz', repeat=4):
+        weighted = sum((index + 2) * ord(letter) for index, letter in enumerate(letters))
+        keys.append(chr(total - weighted) + ''.join(letters))
+        if len(keys) == count:
+            break
+    return keys
+
+
+ATTACKS = (
+    ('hash_function_1', hash_function_1, anagram_keys),
+    ('hash_function_2', hash_function_2, weighted_sum_keys),
+)
+
+MAPS = (
+    ('sc (list chains)', lambda function, **options: hash_map_sc.HashMap(11, function, treeify_threshold=0, **options)),
+    ('sc', lambda function, **options: hash_map_sc.HashMap(11, function, **options)),
+    ('oa', lambda function, **options: hash_map_oa.HashMap(11, function, **options)),
+)
+
+
+def replay(hash_map, keys: list) -> tuple:
+    """Put and then get every key; return (seconds, longest chain or probe sequence afterwards)."""
+    start = time.perf_counter()
+    for index, key in enumerate(keys):
+        hash_map.put(key, index)
+    for key in keys:
+        hash_map.get(key)
+    seconds = time.perf_counter() - start
+
+    stats = hash_map.stats()
+    return seconds, stats.get('chain_max', stats.get('probe_max'))
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threshold = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    print(f"{'hash function':<18}{'map':<18}{'unprotected':>13}{'longest':>9}"
+          f"{'protected':>13}{'longest':>9}{'speedup':>9}")
+    for function_name, function, make_keys in ATTACKS:
+        keys = make_keys(count)
+        assert len({function(key) for key in keys}) == 1
+
+        for map_name, make_map in MAPS:
+            before, before_longest = replay(make_map(function), keys)
+            after, after_longest = replay(make_map(function, flood_threshold=threshold), keys)
+            print(f"{function_name:<18}{map_name:<18}{before:>12.3f}s{before_longest:>9}"
+                  f"{after:>12.3f}s{after_longest:>9}{before / after:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Description: Compares the hash functions in a6_include.py. For every function it
+#              reports throughput (keys hashed per second) and how evenly the keys
+#              spread over the buckets of a separate chaining HashMap: the number of
+#              empty buckets and the longest chain.
+#
+# Usage:       python benchmarks/bench_hash_functions.py [number_of_keys]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from a6_include import (hash_function_1, hash_function_2, hash_function_fnv1a,
+                        hash_function_fnv1a_vectorized, hash_function_xxh64,
+                        keyed_siphash)
+from hash_map_sc import HashMap
+
+
+HASH_FUNCTIONS = (
+    ('hash_function_1', hash_function_1),
+    ('hash_function_2', hash_function_2),
+    ('fnv1a', hash_function_fnv1a),
+    ('xxh64', hash_function_xxh64),
+    ('siphash24', keyed_siphash(0x0706050403020100, 0x0F0E0D0C0B0A0908)),
+)
+
+
+def make_keys(count: int) -> list:
+    """Return composite ids plus anagrams of them, which hash_function_1 cannot tell apart."""
+    keys = ['user' + str(i) + ':session' for i in range(count // 2)]
+    keys += [key[::-1] for key in keys]
+    return keys
+
+
+def measure_throughput(function, keys: list) -> float:
+    """Return how many keys per second the function hashes."""
+    start = time.perf_counter()
+    for key in keys:
+        function(key)
+    return len(keys) / (time.perf_counter() - start)
+
+
+def measure_distribution(function, keys: list) -> tuple:
+    """Fill a HashMap with the keys and return (capacity, empty buckets, longest chain)."""
+    hash_map = HashMap(11, function)
+    for key in keys:
+        hash_map.put(key, None)
+
+    # The longest chain is found by bucketing the hashes the same way the map does
+    capacity = hash_map.get_capacity()
+    chain_lengths = [0] * capacity
+    for key in keys:
+        chain_lengths[function(key) % capacity] += 1
+
+    return capacity, hash_map.empty_buckets(), max(chain_lengths)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    keys = make_keys(count)
+
+    print(f"{'function':<18}{'keys/s':>12}{'capacity':>10}{'empty':>10}{'max chain':>11}")
+    for name, function in HASH_FUNCTIONS:
+        throughput = measure_throughput(function, keys)
+        capacity, empty, longest = measure_distribution(function, keys)
+        print(f"{name:<18}{throughput:>12.0f}{capacity:>10}{empty:>10}{longest:>11}")
+
+    # The vectorized variant is measured on batch hashing, which is what it is for
+    start = time.perf_counter()
+    hash_function_fnv1a_vectorized.hash_many(keys)
+    throughput = len(keys) / (time.perf_counter() - start)
+    print(f"{'fnv1a (batch)':<18}{throughput:>12.0f}")
+
+
+if __name__ == '__main__':
+    main()
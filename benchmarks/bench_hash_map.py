@@ -0,0 +1,244 @@
+# Description: Benchmark suite covering every HashMap operation. Each run measures put,
+#              get (hits and misses), remove, resize_table, get_keys_and_values,
+#              iteration and find_mode for both collision strategies (separate chaining
+#              and open addressing), both provided hash functions and three key
+#              distributions (uniform, Zipfian and adversarial anagrams). Results are
+#              written as JSON, and a previous results file can be given to flag
+#              operations that got slower.
+#
+#              Timing uses time.perf_counter() and keeps the fastest of --repeat runs
+#              instead of building on pyperf or pytest-benchmark. The repository has no
+#              dependency manifest and the HashMaps need nothing outside the standard
+#              library, so the suite runs wherever they do. pyperf's Runner would also
+#              parse the command line itself and rerun this script in worker processes
+#              per benchmark, which does not fit skipping the larger sizes of a
+#              combination once filling it goes over --budget.
+#
+# Usage:       python benchmarks/bench_hash_map.py --sizes 1000 10000 --output results.json
+#              python benchmarks/bench_hash_map.py --output new.json --compare old.json
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+
+
+MAPS = {
+    'sc': lambda function: hash_map_sc.HashMap(11, function),
+    'oa': lambda function: hash_map_oa.HashMap(11, function),
+}
+
+HASH_FUNCTIONS = {
+    'hash_function_1': hash_function_1,
+    'hash_function_2': hash_function_2,
+}
+
+
+# ---------------------------- KEY GENERATION ---------------------------- #
+
+def uniform_keys(count: int, rng: random.Random) -> list:
+    """Return count distinct random alphanumeric keys."""
+    alphabet = 'abcdefghijklmnopqrstuvwxyz0123456789'
+    keys = set()
+    while len(keys) < count:
+        keys.add(''.join(rng.choice(alphabet) for _ in range(12)))
+    return list(keys)
+
+
+def zipfian_keys(count: int, rng: random.Random) -> list:
+    """
+    Return count keys drawn from a vocabulary of count // 10 keys with Zipfian (s = 1.1)
+    frequencies, so a few keys repeat very often; this is the find_mode workload.
+    """
+    vocabulary = uniform_keys(max(count // 10, 1), rng)
+    weights = [1 / (rank ** 1.1) for rank in range(1, len(vocabulary) + 1)]
+    return rng.choices(vocabulary, weights, k=count)
+
+
+def anagram_keys(count: int, rng: random.Random) -> list:
+    """Return count distinct permutations of the same letters; hash_function_1 maps them all together."""
+    return [''.join(letters) for letters in itertools.islice(itertools.permutations('abcdefghijkl'), count)]
+
+
+DISTRIBUTIONS = {
+    'uniform': uniform_keys,
+    'zipfian': zipfian_keys,
+    'anagram': anagram_keys,
+}
+
+
+# ------------------------------ OPERATIONS ------------------------------ #
+
+def fill(map_name: str, function, keys: list):
+    """Return a new map of the given kind holding every key."""
+    hash_map = MAPS[map_name](function)
+    for index, key in enumerate(keys):
+        hash_map.put(key, index)
+    return hash_map
+
+
+def run_operations(map_name: str, function, keys: list, misses: list) -> dict:
+    """Time every operation once on freshly built maps and return {operation: seconds}."""
+    timings = {}
+
+    start = time.perf_counter()
+    hash_map = fill(map_name, function, keys)
+    timings['put'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        hash_map.get(key)
+    timings['get_hit'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in misses:
+        hash_map.get(key)
+    timings['get_miss'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hash_map.get_keys_and_values()
+    timings['get_keys_and_values'] = time.perf_counter() - start
+
+    if hasattr(hash_map, '__iter__'):
+        start = time.perf_counter()
+        for _ in hash_map:
+            pass
+        timings['iterate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hash_map.resize_table(hash_map.get_capacity() * 2)
+    timings['resize_table'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in keys:
+        hash_map.remove(key)
+    timings['remove'] = time.perf_counter() - start
+
+    if map_name == 'sc':
+        values = DynamicArray(keys)
+        start = time.perf_counter()
+        hash_map_sc.find_mode(values)
+        timings['find_mode'] = time.perf_counter() - start
+
+    return timings
+
+
+def run_suite(sizes: list, repeat: int, budget: float, seed: int) -> list:
+    """
+    Run every combination of map, hash function, distribution and size.
+    Each combination is repeated and the fastest time per operation is kept.
+    Once filling a combination takes longer than budget seconds, its larger sizes are skipped.
+    """
+    results = []
+    for map_name, (function_name, function), distribution in itertools.product(
+            MAPS, HASH_FUNCTIONS.items(), DISTRIBUTIONS):
+        over_budget = False
+        for size in sorted(sizes):
+            if over_budget:
+                results.append({'map': map_name, 'hash_function': function_name,
+                                'distribution': distribution, 'size': size, 'skipped': True})
+                print(f"{map_name:<3}{function_name:<17}{distribution:<9}{size:>10}  skipped (over budget)")
+                continue
+
+            rng = random.Random(seed)
+            keys = DISTRIBUTIONS[distribution](size, rng)
+            misses = [key + '!' for key in keys]
+
+            best = {}
+            for _ in range(repeat):
+                for operation, seconds in run_operations(map_name, function, keys, misses).items():
+                    best[operation] = min(seconds, best.get(operation, seconds))
+
+            for operation, seconds in best.items():
+                results.append({'map': map_name, 'hash_function': function_name,
+                                'distribution': distribution, 'size': size,
+                                'operation': operation, 'seconds': seconds,
+                                'ops_per_second': size / seconds if seconds else None})
+            print(f"{map_name:<3}{function_name:<17}{distribution:<9}{size:>10}  "
+                  + '  '.join(f"{operation}={seconds:.4f}s" for operation, seconds in best.items()))
+
+            over_budget = best['put'] > budget
+    return results
+
+
+# ------------------------------ REPORTING ------------------------------- #
+
+def git_commit() -> str:
+    """Return the current commit hash, or None outside of a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result: dict) -> tuple:
+    """Return the fields that identify a measurement across runs."""
+    return (result['map'], result['hash_function'], result['distribution'],
+            result['size'], result.get('operation'))
+
+
+def compare(old_results: list, new_results: list, threshold: float) -> int:
+    """
+    Print every measurement that got more than threshold (as a fraction) slower
+    and return how many there were.
+    """
+    old_times = {result_key(result): result['seconds'] for result in old_results if not result.get('skipped')}
+    regressions = 0
+    for result in new_results:
+        if result.get('skipped') or result_key(result) not in old_times:
+            continue
+        old_seconds = old_times[result_key(result)]
+        if old_seconds and result['seconds'] > old_seconds * (1 + threshold):
+            regressions += 1
+            print("REGRESSION {} {} {} {} {}: {:.4f}s -> {:.4f}s ({:+.0%})".format(
+                *result_key(result), old_seconds, result['seconds'], result['seconds'] / old_seconds - 1))
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Benchmark every HashMap operation.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000],
+                        help='number of keys per run (e.g. 1000 10000 100000 1000000 10000000)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per combination; the fastest is kept')
+    parser.add_argument('--budget', type=float, default=5.0,
+                        help='skip larger sizes once filling a map takes longer than this many seconds')
+    parser.add_argument('--seed', type=int, default=261, help='seed for key generation')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='slowdown (as a fraction) reported as a regression')
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.repeat, args.budget, args.seed)
+    report = {
+        'meta': {'commit': git_commit(), 'python': platform.python_version(),
+                 'platform': platform.platform(), 'timestamp': time.time(),
+                 'sizes': args.sizes, 'repeat': args.repeat, 'seed': args.seed},
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            old_report = json.load(file)
+        if compare(old_report['results'], results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
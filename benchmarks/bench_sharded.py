@@ -0,0 +1,47 @@
+# Description: Aggregate throughput of ShardedHashMap for batched puts and gets as the
+#              number of shard processes grows, next to a single in-process HashMap.
+#              Scaling is bounded by the number of CPU cores.
+#
+# Usage:       python benchmarks/bench_sharded.py [number_of_keys]
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from a6_include import hash_function_fnv1a
+from hash_map_sc import HashMap
+from sharded_hash_map import ShardedHashMap
+
+
+def measure(hash_map, pairs: list, keys: list) -> tuple:
+    """Return (puts per second, gets per second) for one batched put and one batched get."""
+    start = time.perf_counter()
+    hash_map.put_many(pairs)
+    put_rate = len(pairs) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    hash_map.get_many(keys)
+    get_rate = len(keys) / (time.perf_counter() - start)
+    return put_rate, get_rate
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    pairs = [('key' + str(i), i) for i in range(count)]
+    keys = [key for key, _ in pairs]
+    print(f"{count} keys, {os.cpu_count()} CPUs")
+    print(f"{'shards':>8}{'puts/s':>14}{'gets/s':>14}")
+
+    put_rate, get_rate = measure(HashMap(11, hash_function_fnv1a), pairs, keys)
+    print(f"{'local':>8}{put_rate:>14.0f}{get_rate:>14.0f}")
+
+    for shards in (1, 2, 4, 8):
+        with ShardedHashMap(shards, 11, hash_function_fnv1a) as hash_map:
+            put_rate, get_rate = measure(hash_map, pairs, keys)
+        print(f"{shards:>8}{put_rate:>14.0f}{get_rate:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
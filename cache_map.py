@@ -0,0 +1,472 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A bounded cache layered on the separate chaining HashMap. The chain nodes
+#              are CacheNodes that also sit in a doubly linked list kept by the eviction
+#              policy, so get() and put() stay O(1) while the cache is held to a maximum
+#              number of entries and/or bytes:
+#                LRUPolicy - evicts the least recently used entry
+#                LFUPolicy - evicts the least frequently used entry, using frequency
+#                            groups instead of a heap
+#              Entries may also carry a time to live. Expired entries are dropped lazily,
+#              when they are next looked up. memoize() wraps a function with a cache.
+
+import functools
+import sys
+import time
+
+from hash_map_sc import HashMap
+from a6_include import SLNode, hash_function_fnv1a
+
+
+# Returned by get() to the memoize wrapper so a cached None is not mistaken for a miss
+_MISSING = object()
+
+
+class CacheNode(SLNode):
+    """
+    Chain node of a BoundedCacheMap. Besides its place in a bucket's chain, the node
+    is linked into the eviction policy's list through before/after.
+    """
+
+    __slots__ = ('before', 'after', 'group', 'expires', 'nbytes')
+
+    def __init__(self, key: str, value: object, next: SLNode = None, hash: int = None) -> None:
+        """
+        Initialize a node that is not in any policy list yet, never expires and has no size.
+        """
+        super().__init__(key, value, next, hash)
+        self.before = self
+        self.after = self
+        self.group = None
+        self.expires = None
+        self.nbytes = 0
+
+
+def _new_ring() -> CacheNode:
+    """
+    Returns the sentinel of an empty circular list of CacheNodes. Nodes are kept in
+    order of use: sentinel.after is the oldest node and sentinel.before the newest.
+    """
+    return CacheNode(None, None)
+
+
+def _append(ring: CacheNode, node: CacheNode) -> None:
+    """
+    Links the node into the ring as its newest node.
+    """
+    node.before = ring.before
+    node.after = ring
+    ring.before.after = node
+    ring.before = node
+
+
+def _unlink(node: CacheNode) -> None:
+    """
+    Takes the node out of whatever ring it is in.
+    """
+    node.before.after = node.after
+    node.after.before = node.before
+
+
+def _entry_size(key: str, value: object) -> int:
+    """
+    Default size of a cache entry in bytes: the shallow size of the key plus that of the value.
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUPolicy:
+    """
+    Least recently used: evicts the entry that was read or written longest ago.
+    Every node is in one ring in order of use, so all the hooks are O(1).
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty ring."""
+        self._ring = _new_ring()
+
+    def inserted(self, node: CacheNode) -> None:
+        """A new entry is the most recently used one."""
+        _append(self._ring, node)
+
+    def accessed(self, node: CacheNode) -> None:
+        """An entry that is read or written moves to the most recently used end."""
+        _unlink(node)
+        _append(self._ring, node)
+
+    def removed(self, node: CacheNode) -> None:
+        """An entry that leaves the cache leaves the ring."""
+        _unlink(node)
+
+    def victim(self, keep: CacheNode = None) -> CacheNode:
+        """Returns the least recently used entry other than keep, or None if there is none."""
+        node = self._ring.after
+        if node is keep:
+            node = node.after
+        return None if node is self._ring else node
+
+    def clear(self) -> None:
+        """Forget every entry."""
+        self._ring = _new_ring()
+
+
+class _FrequencyGroup:
+    """
+    The entries of an LFUPolicy that have been used count times, in a ring in order of use.
+    Groups form a circular list of their own, ordered by count.
+    """
+
+    __slots__ = ('count', 'lower', 'higher', 'ring')
+
+    def __init__(self, count: int) -> None:
+        """Initialize an empty group that is not linked to any other group."""
+        self.count = count
+        self.lower = self
+        self.higher = self
+        self.ring = _new_ring()
+
+
+class LFUPolicy:
+    """
+    Least frequently used: evicts the entry with the fewest reads and writes, and the least
+    recently used of those on a tie. An entry that is used moves to the group with the next
+    count, which is either the following group or a new one inserted after its own, so
+    all the hooks are O(1).
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty list of groups; the sentinel group has count 0."""
+        self._groups = _FrequencyGroup(0)
+
+    def _group_after(self, group: _FrequencyGroup, count: int) -> _FrequencyGroup:
+        """
+        Returns the group for count, which belongs right after the given group,
+        creating it if it does not exist yet.
+        """
+        higher = group.higher
+        if higher.count == count:
+            return higher
+
+        new_group = _FrequencyGroup(count)
+        new_group.lower = group
+        new_group.higher = higher
+        group.higher = new_group
+        higher.lower = new_group
+        return new_group
+
+    def _leave(self, node: CacheNode) -> None:
+        """
+        Takes the node out of its group, dropping the group once it is empty.
+        """
+        _unlink(node)
+        group = node.group
+        if group.ring.after is group.ring:
+            group.lower.higher = group.higher
+            group.higher.lower = group.lower
+
+    def inserted(self, node: CacheNode) -> None:
+        """A new entry has been used once."""
+        node.group = self._group_after(self._groups, 1)
+        _append(node.group.ring, node)
+
+    def accessed(self, node: CacheNode) -> None:
+        """An entry that is read or written moves to the group with the next count."""
+        # The next group is linked in before the node leaves, in case its own group disappears
+        group = self._group_after(node.group, node.group.count + 1)
+        self._leave(node)
+        node.group = group
+        _append(group.ring, node)
+
+    def removed(self, node: CacheNode) -> None:
+        """An entry that leaves the cache leaves its group."""
+        self._leave(node)
+
+    def victim(self, keep: CacheNode = None) -> CacheNode:
+        """Returns the least frequently used entry other than keep, or None if there is none."""
+        group = self._groups.higher
+        if group is self._groups:
+            return None
+
+        node = group.ring.after
+        if node is keep:
+            node = node.after
+            # keep was the only entry in the lowest group, so we look in the next one
+            if node is group.ring:
+                group = group.higher
+                if group is self._groups:
+                    return None
+                node = group.ring.after
+        return node
+
+    def clear(self) -> None:
+        """Forget every entry."""
+        self._groups = _FrequencyGroup(0)
+
+
+_POLICIES = {'lru': LRUPolicy, 'lfu': LFUPolicy}
+
+
+class BoundedCacheMap:
+    def __init__(self,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 policy='lru',
+                 ttl: float = None,
+                 capacity: int = 11,
+                 function: callable = hash_function_fnv1a,
+                 sizeof: callable = None,
+                 clock: callable = time.monotonic) -> None:
+        """
+        Initialize an empty cache holding at most max_entries entries and/or at most
+        max_bytes bytes, where sizeof(key, value) gives an entry's size (by default the
+        shallow sizes of key and value). At least one of the limits must be given.
+        policy is 'lru', 'lfu' or an object with the same hooks as LRUPolicy.
+        ttl is the default time to live of an entry in seconds of clock(); None means
+        entries only leave the cache when they are evicted.
+        capacity and function are passed on to the underlying separate chaining HashMap.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError("max_entries or max_bytes must be given")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if isinstance(policy, str):
+            if policy not in _POLICIES:
+                raise ValueError("policy must be 'lru', 'lfu' or a policy object")
+            policy = _POLICIES[policy]()
+
+        self._map = HashMap(capacity, function)
+        self._policy = policy
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._sizeof = sizeof if sizeof is not None else _entry_size
+        self._clock = clock
+
+        # Total size of the entries, only tracked when there is a byte limit
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        return str(self._map)
+
+    def get_size(self) -> int:
+        """
+        Return the number of entries, including expired ones that have not been looked up since
+        """
+        return self._map.get_size()
+
+    def get_bytes(self) -> int:
+        """
+        Return the total size of the entries (0 if the cache has no byte limit)
+        """
+        return self._bytes
+
+    # ------------------------------------------------------------------ #
+
+    def _discard(self, node: CacheNode) -> None:
+        """
+        Removes the node from the hash map and from the policy.
+        """
+        self._map._pop_node(node.key, node.hash)
+        self._policy.removed(node)
+        self._bytes -= node.nbytes
+
+    def _live_node(self, key: str) -> CacheNode:
+        """
+        Returns the node holding the given key, or None if the key is not in the cache.
+        An expired node is removed here and counts as not being in the cache.
+        """
+        node = self._map._find_node(key)
+        if node is not None and node.expires is not None and node.expires <= self._clock():
+            self._discard(node)
+            self.expirations += 1
+            return None
+        return node
+
+    def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key and records the use with the policy.
+        If the key is not in the cache (or has expired), returns default.
+        """
+        node = self._live_node(key)
+        if node is None:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        self._policy.accessed(node)
+        return node.value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the cache and has not expired, otherwise False.
+        This does not count as a use of the entry.
+        """
+        return self._live_node(key) is not None
+
+    def put(self, key: str, value: object, ttl: float = None) -> None:
+        """
+        Updates or inserts a key/value pair, then evicts entries chosen by the policy
+        until the cache is within its limits again. The entry expires after ttl seconds,
+        or after the cache's default time to live if ttl is None.
+        An entry larger than max_bytes on its own is not stored at all.
+        """
+        nbytes = 0
+        if self._max_bytes is not None:
+            nbytes = self._sizeof(key, value)
+            if nbytes > self._max_bytes:
+                self.remove(key)
+                return
+
+        node, inserted = self._map._find_or_insert(key, value, None, CacheNode)
+        if inserted:
+            self._policy.inserted(node)
+        else:
+            node.value = value
+            self._bytes -= node.nbytes
+            if node.expires is not None and node.expires <= self._clock():
+                # An expired entry is replaced, so its use so far does not carry over
+                self.expirations += 1
+                self._policy.removed(node)
+                self._policy.inserted(node)
+            else:
+                self._policy.accessed(node)
+
+        node.nbytes = nbytes
+        self._bytes += nbytes
+        if ttl is None:
+            ttl = self._ttl
+        node.expires = None if ttl is None else self._clock() + ttl
+
+        # We never evict the entry that was just written; the limits can always be met without it
+        while ((self._max_entries is not None and self._map.get_size() > self._max_entries)
+               or (self._max_bytes is not None and self._bytes > self._max_bytes)):
+            self._discard(self._policy.victim(node))
+            self.evictions += 1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the cache.
+        If the key is not in the cache, does nothing.
+        """
+        node = self._map._pop_node(key)
+        if node is not None:
+            self._policy.removed(node)
+            self._bytes -= node.nbytes
+
+    def clear(self) -> None:
+        """
+        Removes every entry. The hit, miss, eviction and expiration counters are kept.
+        """
+        self._map.clear()
+        self._policy.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the cache counters:
+        size, bytes                          - current entries and their total size
+        hits, misses, evictions, expirations - totals since the cache was created
+        hit_rate                             - hits / (hits + misses), 0.0 before any get()
+        """
+        lookups = self.hits + self.misses
+        return {
+            'size': self._map.get_size(),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+def _call_key(args: tuple, kwargs: dict) -> str:
+    """
+    Default memoize key: the repr of the positional and keyword arguments.
+    """
+    if kwargs:
+        return repr((args, sorted(kwargs.items())))
+    return repr(args)
+
+
+def memoize(max_entries: int = 128,
+            max_bytes: int = None,
+            policy='lru',
+            ttl: float = None,
+            key: callable = None,
+            function: callable = hash_function_fnv1a):
+    """
+    Decorator that caches a function's results in a BoundedCacheMap.
+    Calls are identified by key(args, kwargs), by default the repr of the arguments,
+    so arguments must have a repr that tells them apart. The other parameters are
+    passed to BoundedCacheMap, and the cache is available as the wrapper's cache attribute.
+    """
+    make_key = key if key is not None else _call_key
+
+    def decorator(fn: callable) -> callable:
+        cache = BoundedCacheMap(max_entries, max_bytes, policy, ttl, function=function)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            call_key = make_key(args, kwargs)
+            result = cache.get(call_key, _MISSING)
+            if result is _MISSING:
+                result = fn(*args, **kwargs)
+                cache.put(call_key, result)
+            return result
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nLRU - at most 3 entries")
+    print("-----------------------")
+    c = BoundedCacheMap(max_entries=3)
+    for name in ('a', 'b', 'c'):
+        c.put(name, name.upper())
+    c.get('a')
+    c.put('d', 'D')
+    print(c.contains_key('a'), c.contains_key('b'), c.get_size(), c.stats())
+
+    print("\nLFU - at most 3 entries")
+    print("-----------------------")
+    c = BoundedCacheMap(max_entries=3, policy='lfu')
+    for name in ('a', 'b', 'c'):
+        c.put(name, name.upper())
+    for name in ('a', 'a', 'b', 'c'):
+        c.get(name)
+    c.put('d', 'D')
+    c.put('e', 'E')
+    print([name for name in 'abcde' if c.contains_key(name)], c.stats()['evictions'])
+
+    print("\nTTL - entries expire when looked up")
+    print("-----------------------------------")
+    now = [0.0]
+    c = BoundedCacheMap(max_entries=10, ttl=5, clock=lambda: now[0])
+    c.put('short', 1, ttl=1)
+    c.put('default', 2)
+    now[0] = 2.0
+    print(c.get('short'), c.get('default'), c.get_size(), c.stats()['expirations'])
+
+    print("\nmemoize")
+    print("-------")
+
+    @memoize(max_entries=100)
+    def fibonacci(n: int) -> int:
+        return n if n < 2 else fibonacci(n - 1) + fibonacci(n - 2)
+
+    print(fibonacci(80), fibonacci.cache.stats())
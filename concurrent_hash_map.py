@@ -0,0 +1,324 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A thread-safe HashMap built on the separate chaining design of hash_map_sc.py.
+#              Buckets are split into contiguous ranges ("stripes") and each stripe has its
+#              own lock, so writers only contend when they touch the same range of buckets.
+#              get() takes no lock at all: the table is published as one immutable
+#              (buckets, capacity) pair, and a resize builds a complete new table while
+#              holding every stripe lock before swapping it in, so readers always see
+#              either the whole old table or the whole new one.
+
+import threading
+
+from a6_include import (DynamicArray, LinkedList,
+                        hash_function_1, hash_function_2)
+
+
+class ConcurrentHashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 stripes: int = 16) -> None:
+        """
+        Initialize new thread-safe HashMap that uses
+        separate chaining for collision resolution
+        and one lock per stripe of buckets.
+        """
+        capacity = self._next_prime(capacity)
+        buckets = DynamicArray()
+        for _ in range(capacity):
+            buckets.append(LinkedList())
+
+        # Readers take this pair in a single attribute read, so they never mix two tables
+        self._table = (buckets, capacity)
+
+        self._hash_function = function
+        self._locks = tuple(threading.Lock() for _ in range(stripes))
+
+        # Each stripe counts its own keys under its own lock; the size is their sum
+        self._counts = [0] * stripes
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        buckets, capacity = self._table
+        out = ''
+        for i in range(capacity):
+            out += str(i) + ': ' + str(buckets[i]) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number and the find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(self._counts)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._table[1]
+
+    # ------------------------------------------------------------------ #
+
+    def _stripe(self, index: int, capacity: int) -> int:
+        """
+        Returns the stripe that owns the given bucket index.
+        Stripes are contiguous ranges of buckets.
+        """
+        return index * len(self._locks) // capacity
+
+    def _lock_bucket(self, hash: int) -> tuple:
+        """
+        Acquires the lock of the stripe owning the bucket for hash in the current table
+        and returns (stripe, bucket). The caller must release the stripe's lock.
+        """
+        while True:
+            table = self._table
+            buckets, capacity = table
+            index = hash % capacity
+            stripe = self._stripe(index, capacity)
+            self._locks[stripe].acquire()
+
+            # A resize may have swapped the table while we waited for the lock
+            if self._table is table:
+                return stripe, buckets.get_at_index(index)
+            self._locks[stripe].release()
+
+    def _lock_all(self) -> None:
+        """
+        Acquires every stripe lock, always in the same order so two callers can't deadlock.
+        """
+        for lock in self._locks:
+            lock.acquire()
+
+    def _unlock_all(self) -> None:
+        """
+        Releases every stripe lock.
+        """
+        for lock in self._locks:
+            lock.release()
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or creates key-value pair in the hash map depending on if key already exists.
+        Resizes the hash table once the load factor reaches 1.0.
+        """
+        hash = self._hash_function(key)
+        stripe, bucket = self._lock_bucket(hash)
+        try:
+            node = bucket.contains(key, hash)
+            if node:
+                node.value = value
+                return
+            bucket.insert(key, value, hash)
+            self._counts[stripe] += 1
+        finally:
+            self._locks[stripe].release()
+
+        # The resize takes every lock, so it must happen after we released ours.
+        # We read the capacity once: if another thread resizes after this point,
+        # _grow() sees the table changed and leaves it alone.
+        capacity = self.get_capacity()
+        if self.get_size() / capacity >= 1.0:
+            self._grow(capacity)
+
+    def _grow(self, seen_capacity: int) -> None:
+        """
+        Doubles the table unless another thread already resized it since
+        seen_capacity was read.
+        """
+        self._lock_all()
+        try:
+            if self._table[1] == seen_capacity:
+                self._rebuild(seen_capacity * 2)
+        finally:
+            self._unlock_all()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Resizes the hash table to the specified new capacity.
+        Rehashes all existing key-value pairs into the new table.
+        If new_capacity < 1, does nothing.
+        Ensures the new capacity is a prime number.
+        """
+        if new_capacity < 1:
+            return
+
+        self._lock_all()
+        try:
+            self._rebuild(new_capacity)
+        finally:
+            self._unlock_all()
+
+    def _rebuild(self, new_capacity: int) -> None:
+        """
+        Builds a complete new table and publishes it in one assignment.
+        The caller must hold every stripe lock.
+        """
+        new_capacity = self._next_prime(new_capacity)
+        new_buckets = DynamicArray()
+        i = 0
+        while i < new_capacity:
+            new_buckets.append(LinkedList())
+            i += 1
+
+        # Readers keep using the old table, which we never modify, until the swap below
+        old_buckets, old_capacity = self._table
+        new_counts = [0] * len(self._locks)
+        i = 0
+        while i < old_capacity:
+            for node in old_buckets.get_at_index(i):
+                new_index = node.hash % new_capacity
+                new_buckets.get_at_index(new_index).insert(node.key, node.value, node.hash)
+                new_counts[self._stripe(new_index, new_capacity)] += 1
+            i += 1
+
+        self._counts = new_counts
+        self._table = (new_buckets, new_capacity)
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the load factor of the hash table.
+        """
+        return self.get_size() / self.get_capacity()
+
+    def empty_buckets(self) -> int:
+        """
+        Calculates and returns the number of empty LinkedLists in the hash table.
+        Concurrent writers may change the answer while it is being computed.
+        """
+        buckets, capacity = self._table
+        empty_buckets_count = 0
+        index = 0
+        while index < capacity:
+            if buckets.get_at_index(index).length() == 0:
+                empty_buckets_count += 1
+            index += 1
+        return empty_buckets_count
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None.
+        Takes no lock.
+        """
+        hash = self._hash_function(key)
+        buckets, capacity = self._table
+
+        # Inserts publish a fully built node at the head of a chain and removes only relink
+        # the chain around a node, so walking a chain while it changes is safe
+        node = buckets.get_at_index(hash % capacity).contains(key, hash)
+        if node:
+            return node.value
+        return None
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Checks if the given key exists in the hash map.
+        Returns True if the key is found, otherwise False.
+        Takes no lock.
+        """
+        hash = self._hash_function(key)
+        buckets, capacity = self._table
+        return bool(buckets.get_at_index(hash % capacity).contains(key, hash))
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, does nothing.
+        """
+        hash = self._hash_function(key)
+        stripe, bucket = self._lock_bucket(hash)
+        try:
+            if bucket.remove(key, hash):
+                self._counts[stripe] -= 1
+        finally:
+            self._locks[stripe].release()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array containing all key-value pairs stored in the hash map.
+        Every stripe is locked while copying, so the result is a consistent snapshot.
+        """
+        key_value_pairs = DynamicArray()
+        self._lock_all()
+        try:
+            buckets, capacity = self._table
+            index = 0
+            while index < capacity:
+                for node in buckets.get_at_index(index):
+                    key_value_pairs.append((node.key, node.value))
+                index += 1
+        finally:
+            self._unlock_all()
+        return key_value_pairs
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing the underlying hash table capacity.
+        """
+        self._lock_all()
+        try:
+            capacity = self._table[1]
+            buckets = DynamicArray()
+            for _ in range(capacity):
+                buckets.append(LinkedList())
+            self._counts = [0] * len(self._locks)
+            self._table = (buckets, capacity)
+        finally:
+            self._unlock_all()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nConcurrent - put from several threads")
+    print("-------------------------------------")
+    m = ConcurrentHashMap(53, hash_function_2)
+
+    def writer(start: int) -> None:
+        for i in range(start, 2000, 4):
+            m.put('str' + str(i), i * 100)
+
+    threads = [threading.Thread(target=writer, args=(start,)) for start in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    result = all(m.get('str' + str(i)) == i * 100 for i in range(2000))
+    print(result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
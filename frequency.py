@@ -0,0 +1,426 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Streaming frequency counting. hash_map_sc.find_mode() needs the whole input
+#              in a DynamicArray and an exact count for every distinct value; the counters
+#              here instead take values from any iterable (or a stream of chunks) one at a
+#              time and report the top-k values, not just the mode:
+#                ExactCounter   - exact counts in a separate chaining HashMap
+#                SpaceSaving    - heavy hitters in a fixed number of counters; counts are
+#                                 overestimated by at most total / counters
+#                MisraGries     - heavy hitters in a fixed number of counters; counts are
+#                                 underestimated by at most total / (counters + 1)
+#                CountMinSketch - counts in a fixed width x depth table; overestimated by at
+#                                 most epsilon * total with probability 1 - delta
+
+import heapq
+import itertools
+import math
+from abc import ABC, abstractmethod
+from array import array
+
+from hash_map_sc import HashMap
+from a6_include import DynamicArray, hash_function_fnv1a, hash_function_xxh64
+
+
+def chunked(values, chunk_size: int = 65536):
+    """
+    Yields the values of any iterable (or DynamicArray) as lists of up to chunk_size values,
+    so a stream that does not fit in memory can be fed to a counter piece by piece.
+    """
+    if isinstance(values, DynamicArray):
+        for start in range(0, values.length(), chunk_size):
+            stop = min(start + chunk_size, values.length())
+            yield [values.get_at_index(index) for index in range(start, stop)]
+        return
+
+    iterator = iter(values)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pop_min(heap: list, current_count) -> tuple:
+    """
+    Removes and returns (count, order, value) for the value with the smallest count from
+    a heap whose recorded counts may be out of date. Counts only grow, so a recorded count
+    is never too high: entries whose count has grown since are pushed back with the
+    current count until the smallest entry is up to date.
+    current_count(value) returns a value's current count.
+    """
+    while True:
+        recorded, order, value = heapq.heappop(heap)
+        count = current_count(value)
+        if count == recorded:
+            return count, order, value
+        heapq.heappush(heap, (count, order, value))
+
+
+class FrequencyCounter(ABC):
+    """
+    Interface shared by the counters: values are added one at a time or from an
+    iterable, and the most frequent ones can be read back at any point.
+    Subclasses implement add(), estimate() and _items().
+    """
+
+    def __init__(self) -> None:
+        """Initialize the count of added values."""
+        self.total = 0
+
+    @abstractmethod
+    def add(self, value: object, count: int = 1) -> None:
+        """Counts count more occurrences of value."""
+
+    @abstractmethod
+    def estimate(self, value: object) -> int:
+        """Returns the (possibly approximate) number of occurrences of value."""
+
+    @abstractmethod
+    def _items(self) -> DynamicArray:
+        """Returns a DynamicArray of (value, count) for every value the counter keeps."""
+
+    def update(self, values) -> None:
+        """
+        Counts every value from any iterable (or DynamicArray).
+        """
+        if isinstance(values, DynamicArray):
+            values = (values.get_at_index(index) for index in range(values.length()))
+        add = self.add
+        for value in values:
+            add(value)
+
+    def update_chunks(self, chunks) -> None:
+        """
+        Counts every value of every chunk from an iterable of chunks, e.g. the output
+        of chunked() or batches read from a file.
+        """
+        for chunk in chunks:
+            self.update(chunk)
+
+    def top_k(self, k: int) -> DynamicArray:
+        """
+        Returns a DynamicArray of up to k (value, count) tuples, most frequent first.
+        Values with the same count keep the order the counter stores them in.
+        """
+        items = self._items()
+        ordered = sorted((items.get_at_index(index) for index in range(items.length())),
+                         key=lambda item: -item[1])
+        return DynamicArray(ordered[:k])
+
+    def mode(self) -> tuple:
+        """
+        Returns (DynamicArray of every value with the highest count, that count),
+        like hash_map_sc.find_mode().
+        """
+        items = self._items()
+        highest_frequency = 0
+        index = 0
+        while index < items.length():
+            highest_frequency = max(highest_frequency, items.get_at_index(index)[1])
+            index += 1
+
+        modes = DynamicArray()
+        index = 0
+        while index < items.length():
+            value, count = items.get_at_index(index)
+            if count == highest_frequency:
+                modes.append(value)
+            index += 1
+        return modes, highest_frequency
+
+
+class ExactCounter(FrequencyCounter):
+    """
+    Exact counts for every distinct value, kept in a separate chaining HashMap.
+    Memory grows with the number of distinct values.
+    """
+
+    def __init__(self, capacity: int = 11, function: callable = hash_function_fnv1a) -> None:
+        """Initialize an empty counter whose HashMap starts with the given capacity."""
+        super().__init__()
+        self._counts = HashMap(capacity, function)
+
+    def add(self, value: object, count: int = 1) -> None:
+        """Counts count more occurrences of value."""
+        self._counts.increment(value, count)
+        self.total += count
+
+    def update(self, values) -> None:
+        """
+        Counts every value from any iterable (or DynamicArray).
+        """
+        if isinstance(values, DynamicArray):
+            values = (values.get_at_index(index) for index in range(values.length()))
+        increment = self._counts.increment
+        count = 0
+        for value in values:
+            increment(value)
+            count += 1
+        self.total += count
+
+    def estimate(self, value: object) -> int:
+        """Returns the number of occurrences of value."""
+        count = self._counts.get(value)
+        return 0 if count is None else count
+
+    def _items(self) -> DynamicArray:
+        """Returns a DynamicArray of (value, count) for every distinct value."""
+        return self._counts.get_keys_and_values()
+
+
+class SpaceSaving(FrequencyCounter):
+    """
+    The Space-Saving algorithm: a fixed number of counters. A value that is not counted
+    yet takes over the counter with the smallest count and adds to it, so a value's count
+    overestimates its true frequency by at most error_bound() = total / counters, and
+    every value occurring more than that often is guaranteed to hold a counter.
+    """
+
+    def __init__(self, counters: int, function: callable = hash_function_fnv1a) -> None:
+        """Initialize a summary that keeps at most the given number of counters."""
+        super().__init__()
+        self._counters = counters
+
+        # value -> [count, overestimation], and a heap to find the smallest count
+        self._counts = HashMap(2 * counters, function)
+        self._heap = []
+        self._order = 0
+
+    def add(self, value: object, count: int = 1) -> None:
+        """Counts count more occurrences of value."""
+        self.total += count
+        entry = self._counts.get(value)
+        if entry is not None:
+            entry[0] += count
+            return
+
+        overestimation = 0
+        if self._counts.get_size() >= self._counters:
+            # The value replaces the one with the smallest count and inherits that count
+            overestimation, _, victim = _pop_min(self._heap, lambda key: self._counts.get(key)[0])
+            self._counts.remove(victim)
+
+        self._counts.put(value, [overestimation + count, overestimation])
+        heapq.heappush(self._heap, (overestimation + count, self._order, value))
+        self._order += 1
+
+    def estimate(self, value: object) -> int:
+        """
+        Returns the counted occurrences of value: at least its true frequency and at most
+        error_bound() more. A value without a counter occurred at most error_bound() times; 0 is returned.
+        """
+        entry = self._counts.get(value)
+        return 0 if entry is None else entry[0]
+
+    def error_bound(self) -> float:
+        """Returns the largest possible overestimation of any count."""
+        return self.total / self._counters
+
+    def _items(self) -> DynamicArray:
+        """Returns a DynamicArray of (value, count) for every value holding a counter."""
+        pairs = self._counts.get_keys_and_values()
+        return DynamicArray([(pairs[index][0], pairs[index][1][0]) for index in range(pairs.length())])
+
+
+class MisraGries(FrequencyCounter):
+    """
+    The Misra-Gries algorithm: a fixed number of counters. When a new value finds every
+    counter taken, all counts are lowered instead, so a value's count underestimates its
+    true frequency by at most error_bound() = total / (counters + 1), and every value
+    occurring more than that often is guaranteed to hold a counter.
+    """
+
+    def __init__(self, counters: int, function: callable = hash_function_fnv1a) -> None:
+        """Initialize a summary that keeps at most the given number of counters."""
+        super().__init__()
+        self._counters = counters
+        self._counts = HashMap(2 * counters, function)
+
+    def add(self, value: object, count: int = 1) -> None:
+        """Counts count more occurrences of value."""
+        self.total += count
+        if self._counts.get(value) is not None:
+            self._counts.increment(value, count)
+            return
+
+        # Each round lowers every count (and the new value's) by the smallest amount
+        # that frees at least one counter; the total lowered stays below total / (counters + 1)
+        while count > 0 and self._counts.get_size() >= self._counters:
+            pairs = self._counts.get_keys_and_values()
+            decrement = count
+            index = 0
+            while index < pairs.length():
+                decrement = min(decrement, pairs.get_at_index(index)[1])
+                index += 1
+
+            index = 0
+            while index < pairs.length():
+                key, current = pairs.get_at_index(index)
+                if current == decrement:
+                    self._counts.remove(key)
+                else:
+                    self._counts.put(key, current - decrement)
+                index += 1
+            count -= decrement
+
+        if count > 0:
+            self._counts.put(value, count)
+
+    def estimate(self, value: object) -> int:
+        """
+        Returns the counted occurrences of value: at most its true frequency and at least
+        its true frequency minus error_bound().
+        """
+        count = self._counts.get(value)
+        return 0 if count is None else count
+
+    def error_bound(self) -> float:
+        """Returns the largest possible underestimation of any count."""
+        return self.total / (self._counters + 1)
+
+    def _items(self) -> DynamicArray:
+        """Returns a DynamicArray of (value, count) for every value holding a counter."""
+        return self._counts.get_keys_and_values()
+
+
+class CountMinSketch(FrequencyCounter):
+    """
+    A Count-Min sketch: depth rows of width counters, each row indexed by a different hash
+    of the value. A value's estimate is its smallest counter, which overestimates its true
+    frequency by at most e / width * total with probability at least 1 - e ** -depth.
+    The sketch itself keeps no values, so top_k() reports the `track` values with the
+    highest estimates seen so far.
+    """
+
+    def __init__(self, width: int, depth: int, track: int = 100,
+                 function: callable = hash_function_xxh64, seed: int = 0) -> None:
+        """
+        Initialize a sketch of depth rows with width counters each. The track values
+        with the highest estimates are remembered for top_k().
+        function must return 64-bit hashes; row i uses the i-th of a family of hashes
+        derived from it.
+        """
+        super().__init__()
+        self._width = width
+        self._depth = depth
+        self._hash_function = function
+        self._seed = seed
+        self._rows = [array('Q', bytes(8 * width)) for _ in range(depth)]
+
+        # The candidates for top_k(): value -> estimate, and a heap to find the smallest
+        self._track = track
+        self._candidates = HashMap(2 * track + 1, hash_function_fnv1a)
+        self._heap = []
+        self._order = 0
+
+    @classmethod
+    def from_error(cls, epsilon: float, delta: float, track: int = 100, **options) -> "CountMinSketch":
+        """
+        Returns a sketch whose estimates exceed the true count by at most epsilon * total
+        with probability at least 1 - delta.
+        """
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)), track, **options)
+
+    def _indices(self, value: object) -> list:
+        """
+        Returns the counter index of value in each row. The row hashes are h1 + i * h2
+        for the two halves of one 64-bit hash, which is as good as depth independent hashes.
+        """
+        hash = self._hash_function(value, self._seed) if self._seed else self._hash_function(value)
+        low = hash & 0xFFFFFFFF
+        high = (hash >> 32) | 1
+        return [(low + row * high) % self._width for row in range(self._depth)]
+
+    def add(self, value: object, count: int = 1) -> None:
+        """Counts count more occurrences of value."""
+        self.total += count
+        estimate = None
+        for row, index in zip(self._rows, self._indices(value)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        self._remember(value, estimate)
+
+    def _remember(self, value: object, estimate: int) -> None:
+        """
+        Keeps value as a top_k() candidate if its estimate is among the track highest.
+        """
+        if self._track <= 0:
+            return
+        if self._candidates.get(value) is not None:
+            self._candidates.put(value, estimate)
+            return
+
+        if self._candidates.get_size() >= self._track:
+            lowest, order, victim = _pop_min(self._heap, self._candidates.get)
+            if estimate <= lowest:
+                heapq.heappush(self._heap, (lowest, order, victim))
+                return
+            self._candidates.remove(victim)
+
+        self._candidates.put(value, estimate)
+        heapq.heappush(self._heap, (estimate, self._order, value))
+        self._order += 1
+
+    def estimate(self, value: object) -> int:
+        """
+        Returns the estimated occurrences of value: never below its true frequency.
+        """
+        return min(row[index] for row, index in zip(self._rows, self._indices(value)))
+
+    def error_bound(self) -> float:
+        """Returns the overestimation that is exceeded with probability at most e ** -depth."""
+        return math.e / self._width * self.total
+
+    def _items(self) -> DynamicArray:
+        """Returns a DynamicArray of (value, estimate) for every top_k() candidate."""
+        return self._candidates.get_keys_and_values()
+
+
+_METHODS = {
+    'exact': ExactCounter,
+    'space_saving': SpaceSaving,
+    'misra_gries': MisraGries,
+    'count_min': CountMinSketch,
+}
+
+
+def top_k(values, k: int, method: str = 'exact', chunk_size: int = 65536, **options) -> DynamicArray:
+    """
+    Counts the values of any iterable (or DynamicArray) in chunks and returns a DynamicArray
+    of the k most frequent (value, count) tuples. method is 'exact', 'space_saving',
+    'misra_gries' or 'count_min'; options are passed to that counter's constructor
+    (e.g. counters=1000, or width and depth).
+    """
+    if method not in _METHODS:
+        raise ValueError(f"method must be one of {', '.join(_METHODS)}")
+    counter = _METHODS[method](**options)
+    counter.update_chunks(chunked(values, chunk_size))
+    return counter.top_k(k)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    import random
+
+    rng = random.Random(261)
+    vocabulary = ['page' + str(i) for i in range(1000)]
+    weights = [1 / rank ** 1.2 for rank in range(1, len(vocabulary) + 1)]
+    stream = rng.choices(vocabulary, weights, k=50000)
+
+    print("\nFrequency - exact top 5 and mode")
+    print("--------------------------------")
+    exact = ExactCounter()
+    exact.update_chunks(chunked(iter(stream), 4096))
+    print(exact.top_k(5))
+    mode, frequency = exact.mode()
+    print(f"Mode : {mode}, Frequency: {frequency}")
+
+    print("\nFrequency - approximate top 5")
+    print("-----------------------------")
+    for counter in (SpaceSaving(50), MisraGries(50), CountMinSketch.from_error(0.001, 0.01, track=20)):
+        counter.update(stream)
+        print(type(counter).__name__, counter.top_k(5), round(counter.error_bound(), 1))
@@ -0,0 +1,417 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A compact, insertion-ordered version of the open addressing HashMap, laid
+#              out like CPython's dict. The hash table itself is only a sparse index: an
+#              array of small integers (int8, int16, int32 or int64, whichever fits the
+#              capacity) pointing into dense arrays of hashes, keys and values that are
+#              kept in insertion order. Iteration and get_keys_and_values() scan the dense
+#              arrays, so they cost O(size) rather than O(capacity), and resizing only
+#              rebuilds the index. Collision resolution in the index is the same quadratic
+#              probing over prime capacities as in hash_map_oa.py, and the interface is the same too.
+
+from array import array
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+
+
+# Index values below 0: a bucket that was never used, and one whose entry was removed
+_EMPTY = -1
+_DUMMY = -2
+
+# Marks a removed entry in the dense key array
+_DELETED = object()
+
+# Cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def _new_index(capacity: int) -> array:
+    """
+    Returns an index of capacity empty buckets, using the smallest signed integer type
+    that can hold every entry position. put() keeps the entry arrays shorter than the
+    capacity, so positions are at most capacity - 1.
+    """
+    if capacity <= 0x7F:
+        typecode = 'b'
+    elif capacity <= 0x7FFF:
+        typecode = 'h'
+    elif capacity <= 0x7FFFFFFF:
+        typecode = 'i'
+    else:
+        typecode = 'q'
+    return array(typecode, [_EMPTY]) * capacity
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses
+        quadratic probing for collision resolution, with the table stored
+        as a sparse index into dense, insertion-ordered entry arrays.
+        """
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._index = _new_index(self._capacity)
+
+        # Dense entry arrays, in insertion order; removed entries leave a hole until the next rebuild
+        self._hashes = array('Q')
+        self._keys = []
+        self._values = []
+
+        self._hash_function = function
+        self._size = 0
+
+        # Index buckets whose entry was removed
+        self._dummies = 0
+
+        # Bumped whenever the entry arrays are rebuilt, so iterators can tell the table changed
+        self._version = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            position = self._index[i]
+            if position == _EMPTY:
+                out += str(i) + ': None\n'
+            elif position == _DUMMY:
+                out += str(i) + ': TS\n'
+            else:
+                out += f"{i}: K: {self._keys[position]} V: {self._values[position]}\n"
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _find_bucket(self, key: str, hash: int) -> int:
+        """
+        Returns the index bucket pointing at the given key's entry, or -1 if the key is not in the table.
+        """
+        capacity = self._capacity
+        index = self._index
+        hashes = self._hashes
+        home = hash % capacity
+        probe = 0
+
+        while probe < capacity:
+            bucket = (home + probe * probe) % capacity
+            position = index[bucket]
+            if position == _EMPTY:
+                return -1
+            # Only entries with the same cached hash need a key comparison
+            if position >= 0 and hashes[position] == hash and self._keys[position] == key:
+                return bucket
+            probe += 1
+
+        return -1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or inserts a key/value pair into the hash map.
+        If the key is already in the hash map, replace its value.
+        If the key is not in the hash map, add a new entry at the end of the insertion order.
+        """
+        # If adding a new key would cause the load factor to be >= 0.5,
+        # we must first resize the table to double its current capacity.
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        # Removed entries still occupy index buckets, so we rebuild to clear them before
+        # quadratic probing could fail to reach an empty bucket. Their holes also stay in the
+        # entry arrays, so we close those before a new position could outgrow the index type.
+        elif (self._size + self._dummies) / self._capacity >= 0.5 or len(self._keys) >= self._capacity:
+            self._rebuild(self._capacity)
+
+        hash = self._hash_function(key) & _HASH_MASK
+        capacity = self._capacity
+        index = self._index
+        home = hash % capacity
+        first_dummy = -1
+
+        probe = 0
+        while probe < capacity:
+            bucket = (home + probe * probe) % capacity
+            position = index[bucket]
+
+            if position == _EMPTY:
+                # Reuse the first removed bucket we passed, if any
+                if first_dummy != -1:
+                    bucket = first_dummy
+                    self._dummies -= 1
+                index[bucket] = len(self._keys)
+                self._hashes.append(hash)
+                self._keys.append(key)
+                self._values.append(value)
+                self._size += 1
+                return
+
+            elif position == _DUMMY:
+                if first_dummy == -1:
+                    first_dummy = bucket
+
+            elif self._hashes[position] == hash and self._keys[position] == key:
+                # Key found; update its value in place, keeping its position in the order
+                self._values[position] = value
+                return
+
+            probe += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the index. The entry arrays are only compacted
+        if removals left holes in them; their order does not change.
+        """
+        # If new_capacity is less than the current number of elements in the hash map, we do nothing.
+        if new_capacity < self._size:
+            return
+
+        new_capacity = self._next_prime(new_capacity)
+
+        # We grow the target capacity up front exactly as put() would have while re-inserting
+        count = 0
+        while count < self._size:
+            if count / new_capacity >= 0.5:
+                new_capacity = self._next_prime(new_capacity * 2)
+            count += 1
+
+        self._rebuild(new_capacity)
+
+    def _rebuild(self, new_capacity: int) -> None:
+        """
+        Closes the holes left by removed entries and builds a new index with
+        new_capacity buckets from the cached hashes.
+        """
+        if len(self._keys) != self._size:
+            hashes = array('Q')
+            keys = []
+            values = []
+            position = 0
+            while position < len(self._keys):
+                if self._keys[position] is not _DELETED:
+                    hashes.append(self._hashes[position])
+                    keys.append(self._keys[position])
+                    values.append(self._values[position])
+                position += 1
+            self._hashes, self._keys, self._values = hashes, keys, values
+            self._version += 1
+
+        index = _new_index(new_capacity)
+        hashes = self._hashes
+        position = 0
+        while position < self._size:
+            home = hashes[position] % new_capacity
+            bucket = home
+            probe = 0
+
+            # The new index holds no removed buckets or duplicates, so we just find the first empty bucket
+            while index[bucket] != _EMPTY:
+                probe += 1
+                bucket = (home + probe * probe) % new_capacity
+
+            index[bucket] = position
+            position += 1
+
+        self._index = index
+        self._capacity = new_capacity
+        self._dummies = 0
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the index.
+        Buckets of removed entries are not counted.
+        """
+        return self._capacity - self._size - self._dummies
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None.
+        """
+        bucket = self._find_bucket(key, self._hash_function(key) & _HASH_MASK)
+        if bucket == -1:
+            return None
+        return self._values[self._index[bucket]]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._find_bucket(key, self._hash_function(key) & _HASH_MASK) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, this method does nothing.
+        """
+        bucket = self._find_bucket(key, self._hash_function(key) & _HASH_MASK)
+        if bucket == -1:
+            return
+
+        # The entry becomes a hole; we drop the references so the key and value can be freed
+        position = self._index[bucket]
+        self._index[bucket] = _DUMMY
+        self._keys[position] = _DELETED
+        self._values[position] = None
+        self._size -= 1
+        self._dummies += 1
+
+        # Once holes make up most of the entry arrays we close them
+        if len(self._keys) > 2 * self._size + 8:
+            self._rebuild(self._capacity)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple (key, value)
+        for each key/value pair stored in the hash map, in insertion order.
+        """
+        return DynamicArray([(key, value) for key, value in zip(self._keys, self._values)
+                             if key is not _DELETED])
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing the underlying capacity.
+        """
+        self._index = _new_index(self._capacity)
+        self._hashes = array('Q')
+        self._keys = []
+        self._values = []
+        self._size = 0
+        self._dummies = 0
+        self._version += 1
+
+    # ----------------------------- ITERATION ----------------------------- #
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the hash map, in insertion order.
+        Raises RuntimeError if the entry arrays are rebuilt while iterating.
+        """
+        version = self._version
+        keys, values = self._keys, self._values
+        position = 0
+        while position < len(keys):
+            key = keys[position]
+            if key is not _DELETED:
+                yield key, values[position]
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+            position += 1
+
+    def keys(self):
+        """
+        Yields every key in the hash map, in insertion order.
+        """
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        """
+        Yields every value in the hash map, in insertion order.
+        """
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self):
+        """
+        Returns a new iterator over the entries of the hash map, in insertion order.
+        There are no stored HashEntry objects, so one is built for each entry.
+        """
+        hashes = self._hashes
+        position = 0
+        for key, value in self.items():
+            while self._keys[position] is _DELETED:
+                position += 1
+            yield HashEntry(key, value, hashes[position])
+            position += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nDense layout - put example")
+    print("--------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nDense layout - remove and iterate in insertion order")
+    print("----------------------------------------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    m.put('0', 'back')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nDense layout - churn past the int8 and int16 index limits")
+    print("---------------------------------------------------------")
+    # Removing and putting back the same key reuses its index bucket but leaves a hole in the
+    # entry arrays, so the next new positions would pass what the index type can hold
+    for capacity in (127, 32749):
+        m = HashMap(capacity, hash_function_2)
+        live = capacity // 2 - 5
+        for i in range(live):
+            m.put('str' + str(i), i)
+        for i in range(live + 7):
+            m.remove('str' + str(i % live))
+            m.put('str' + str(i % live), i)
+        for i in range(6):
+            m.put('new' + str(i), i)
+        print(m.get_capacity(), m._index.typecode, m.get_size(), m.get('str0'), m.get('new5'))
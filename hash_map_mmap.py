@@ -0,0 +1,531 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A file-backed version of the open addressing HashMap. The whole table lives
+#              in a memory-mapped file: a small header, the bucket array (cached hash,
+#              bucket state and the offset of the key/value record) and a heap of
+#              key/value records. Opening an existing file only reads the header, pages are
+#              loaded lazily by the OS on first use, and several read-only processes share
+#              them through the page cache. Collision resolution is the same quadratic
+#              probing over prime capacities as in hash_map_oa.py. Resizing writes a
+#              complete new file next to the old one and atomically renames it into place,
+#              so a crash leaves either the old or the new table, never a mix. Single puts
+#              and removes are not crash-safe: they change the record heap, a bucket and the
+#              header in place, and the OS writes those pages back in no particular order.
+#              Only what was written before the last flush(), close(), resize or clear() is
+#              sure to be consistent on disk.
+#
+#              File layout (all integers little-endian):
+#                header  - magic, format version, capacity, size, tombstones, heap end,
+#                          name of the hash function
+#                buckets - capacity * (hash: u64, state: u8, padding, record offset: u64)
+#                heap    - records of (key length: u32, value length: u32, UTF-8 key,
+#                          pickled value), appended as keys are put
+
+import mmap
+import os
+import pickle
+import struct
+
+from a6_include import HashEntry, DynamicArray, hash_function_1
+
+
+_MAGIC = b'HMOA'
+_VERSION = 1
+
+_HEADER = struct.Struct('<4sIQQQQ32s')
+_HEADER_SIZE = 128
+_BUCKET = struct.Struct('<QB7xQ')
+_RECORD = struct.Struct('<II')
+
+# Bucket states
+_EMPTY = 0
+_LIVE = 1
+_TOMBSTONE = 2
+
+_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+class HashMap:
+    def __init__(self, path: str, function, capacity: int = 11,
+                 readonly: bool = False) -> None:
+        """
+        Open the hash map stored in the file at path, or create it with the given
+        capacity if the file does not exist. The hash function must give the same
+        hash for a key in every process (the provided hash functions do, Python's
+        built-in hash() does not); its name is stored in the file and checked on open.
+        With readonly=True the file is mapped read-only and can be shared by many processes.
+        """
+        self._path = path
+        self._hash_function = function
+        self._readonly = readonly
+
+        # Bumped whenever entries may move to other buckets, so iterators can tell the table changed
+        self._version = 0
+
+        if not os.path.exists(path):
+            if readonly:
+                raise FileNotFoundError(path)
+            self._create(path, self._next_prime(capacity), 0)
+
+        self._open()
+        if self._function_name != self._name_of(function):
+            name = self._function_name.decode('utf-8')
+            self.close()
+            raise ValueError(f"{path} was built with hash function {name!r}")
+
+    def __enter__(self) -> "HashMap":
+        """Use the map in a with statement so the file is always closed."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Close the file when leaving the with statement."""
+        self.close()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            hash, state, offset = self._read_bucket(i)
+            if state == _EMPTY:
+                out += str(i) + ': None\n'
+            else:
+                key, value = self._read_record(offset)
+                out += f"{i}: K: {key} V: {value} TS: {state == _TOMBSTONE}\n"
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ---------------------------- FILE HANDLING ---------------------------- #
+
+    @staticmethod
+    def _name_of(function) -> bytes:
+        """
+        Returns the name stored in the header to identify a hash function.
+        """
+        name = getattr(function, '__qualname__', None) or type(function).__qualname__
+        return name.encode('utf-8')[:32]
+
+    def _create(self, path: str, capacity: int, heap_size: int) -> None:
+        """
+        Writes an empty table with the given capacity (and room for heap_size heap bytes)
+        to path; every bucket starts out empty because the file is zero-filled.
+        """
+        heap_start = _HEADER_SIZE + capacity * _BUCKET.size
+        with open(path, 'wb') as file:
+            file.write(_HEADER.pack(_MAGIC, _VERSION, capacity, 0, 0, heap_start,
+                                    self._name_of(self._hash_function)))
+            file.truncate(heap_start + max(heap_size, 4096))
+
+    def _open(self) -> None:
+        """
+        Maps the file and reads its header; nothing else is read until it is used.
+        """
+        self._file = open(self._path, 'rb' if self._readonly else 'r+b')
+        access = mmap.ACCESS_READ if self._readonly else mmap.ACCESS_WRITE
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=access)
+
+        magic, version, capacity, size, tombstones, heap_end, name = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"{self._path} is not a hash map file of version {_VERSION}")
+        self._capacity = capacity
+        self._size = size
+        self._tombstones = tombstones
+        self._heap_end = heap_end
+        self._function_name = name.rstrip(b'\0')
+
+    def _write_header(self) -> None:
+        """
+        Stores the current capacity, size, tombstone count and heap end in the header.
+        """
+        _HEADER.pack_into(self._mmap, 0, _MAGIC, _VERSION, self._capacity, self._size,
+                          self._tombstones, self._heap_end, self._function_name)
+
+    def flush(self) -> None:
+        """
+        Writes all changes made through the mapping back to the file. Until then a crash
+        can leave puts and removes partly written, e.g. a bucket pointing past the heap end.
+        """
+        if not self._readonly:
+            self._mmap.flush()
+
+    def close(self) -> None:
+        """
+        Flushes and unmaps the file. The map can't be used afterwards.
+        """
+        if self._mmap is not None:
+            self.flush()
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+
+    def _read_bucket(self, index: int) -> tuple:
+        """
+        Returns (hash, state, record offset) of the bucket at index.
+        """
+        return _BUCKET.unpack_from(self._mmap, _HEADER_SIZE + index * _BUCKET.size)
+
+    def _write_bucket(self, index: int, hash: int, state: int, offset: int) -> None:
+        """
+        Stores hash, state and record offset in the bucket at index.
+        """
+        _BUCKET.pack_into(self._mmap, _HEADER_SIZE + index * _BUCKET.size, hash, state, offset)
+
+    def _read_key(self, offset: int) -> bytes:
+        """
+        Returns the encoded key of the record at offset.
+        """
+        key_length, _ = _RECORD.unpack_from(self._mmap, offset)
+        start = offset + _RECORD.size
+        return self._mmap[start:start + key_length]
+
+    def _read_record(self, offset: int) -> tuple:
+        """
+        Returns the (key, value) stored in the record at offset.
+        """
+        key_length, value_length = _RECORD.unpack_from(self._mmap, offset)
+        start = offset + _RECORD.size
+        key = self._mmap[start:start + key_length].decode('utf-8')
+        value = pickle.loads(self._mmap[start + key_length:start + key_length + value_length])
+        return key, value
+
+    def _append_record(self, key: bytes, value: bytes) -> int:
+        """
+        Appends a record to the heap, growing the file if needed, and returns its offset.
+        """
+        needed = self._heap_end + _RECORD.size + len(key) + len(value)
+        if needed > len(self._mmap):
+            # We double the file so that appends stay amortized O(1)
+            self._mmap.resize(max(needed, 2 * len(self._mmap)))
+
+        offset = self._heap_end
+        _RECORD.pack_into(self._mmap, offset, len(key), len(value))
+        start = offset + _RECORD.size
+        self._mmap[start:start + len(key)] = key
+        self._mmap[start + len(key):needed] = value
+        self._heap_end = needed
+        return offset
+
+    # ------------------------------------------------------------------ #
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the hash of key as an unsigned 64-bit integer, as stored in the buckets.
+        """
+        return self._hash_function(key) & _HASH_MASK
+
+    def _find_index(self, encoded_key: bytes, hash: int) -> int:
+        """
+        Returns the bucket index holding the given key, or -1 if the key is not in the table.
+        """
+        index = hash % self._capacity
+        probe = 0
+        while probe < self._capacity:
+            current_index = (index + probe * probe) % self._capacity
+            bucket_hash, state, offset = self._read_bucket(current_index)
+            if state == _EMPTY:
+                return -1
+            # The key itself is only read for live buckets with the same hash
+            if state == _LIVE and bucket_hash == hash and self._read_key(offset) == encoded_key:
+                return current_index
+            probe += 1
+        return -1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or inserts a key/value pair into the hash map.
+        If the key is already in the hash map, replace its value.
+        If the key is not in the hash map, add a new entry.
+        The change is only sure to reach the file in a consistent state at the next flush().
+        """
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+        elif (self._size + self._tombstones) / self._capacity >= 0.5:
+            self._rebuild(self._capacity)
+
+        encoded_key = key.encode('utf-8')
+        hash = self._hash(key)
+        offset = self._append_record(encoded_key, pickle.dumps(value))
+
+        index = hash % self._capacity
+        first_tombstone_index = -1
+        probe = 0
+        while probe < self._capacity:
+            current_index = (index + probe * probe) % self._capacity
+            bucket_hash, state, old_offset = self._read_bucket(current_index)
+
+            if state == _EMPTY:
+                if first_tombstone_index != -1:
+                    current_index = first_tombstone_index
+                    self._tombstones -= 1
+                self._size += 1
+                self._version += 1
+                break
+
+            elif state == _TOMBSTONE:
+                if first_tombstone_index == -1:
+                    first_tombstone_index = current_index
+
+            elif bucket_hash == hash and self._read_key(old_offset) == encoded_key:
+                # Records are never rewritten in place; the old one becomes garbage
+                # that the next rebuild leaves behind
+                break
+
+            probe += 1
+
+        # The record is complete before the bucket points at it
+        self._write_bucket(current_index, hash, _LIVE, offset)
+        self._write_header()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the table, growing it as put() would so the load
+        stays below 0.5. The new table is written to a separate file and then
+        atomically renamed over the old one.
+        """
+        if new_capacity < self._size:
+            return
+
+        new_capacity = self._next_prime(new_capacity)
+        count = 0
+        while count < self._size:
+            if count / new_capacity >= 0.5:
+                new_capacity = self._next_prime(new_capacity * 2)
+            count += 1
+
+        self._rebuild(new_capacity)
+
+    def _rebuild(self, new_capacity: int) -> None:
+        """
+        Writes every live entry into a new file with new_capacity buckets (dropping
+        tombstones and garbage records), makes it durable, and renames it over the
+        current file.
+        """
+        temporary_path = self._path + '.tmp'
+        self._create(temporary_path, new_capacity, self._heap_end - self._heap_start())
+
+        with open(temporary_path, 'r+b') as file:
+            new_map = mmap.mmap(file.fileno(), 0)
+            heap_end = _HEADER_SIZE + new_capacity * _BUCKET.size
+
+            index = 0
+            while index < self._capacity:
+                hash, state, offset = self._read_bucket(index)
+                if state == _LIVE:
+                    # Copy the record as raw bytes
+                    key_length, value_length = _RECORD.unpack_from(self._mmap, offset)
+                    record_end = offset + _RECORD.size + key_length + value_length
+                    new_offset = heap_end
+                    heap_end += record_end - offset
+                    new_map[new_offset:heap_end] = self._mmap[offset:record_end]
+
+                    # The new table has no tombstones, so we probe for the first empty bucket
+                    home = hash % new_capacity
+                    current_index = home
+                    probe = 0
+                    while _BUCKET.unpack_from(new_map, _HEADER_SIZE + current_index * _BUCKET.size)[1] != _EMPTY:
+                        probe += 1
+                        current_index = (home + probe * probe) % new_capacity
+                    _BUCKET.pack_into(new_map, _HEADER_SIZE + current_index * _BUCKET.size,
+                                      hash, _LIVE, new_offset)
+                index += 1
+
+            _HEADER.pack_into(new_map, 0, _MAGIC, _VERSION, new_capacity, self._size, 0, heap_end,
+                              self._function_name)
+            new_map.flush()
+            new_map.close()
+            os.fsync(file.fileno())
+
+        # The rename is atomic: a crash before it keeps the old file, after it the new one
+        self.close()
+        os.replace(temporary_path, self._path)
+        self._open()
+        self._version += 1
+
+    def _heap_start(self) -> int:
+        """
+        Returns the file offset where the record heap begins.
+        """
+        return _HEADER_SIZE + self._capacity * _BUCKET.size
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None.
+        """
+        index = self._find_index(key.encode('utf-8'), self._hash(key))
+        if index == -1:
+            return None
+        return self._read_record(self._read_bucket(index)[2])[1]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._find_index(key.encode('utf-8'), self._hash(key)) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, this method does nothing.
+        """
+        index = self._find_index(key.encode('utf-8'), self._hash(key))
+        if index == -1:
+            return
+
+        hash, _, offset = self._read_bucket(index)
+        self._write_bucket(index, hash, _TOMBSTONE, offset)
+        self._size -= 1
+        self._tombstones += 1
+        self._version += 1
+        self._write_header()
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple (key, value)
+        for each live key/value pair stored in the hash map.
+        """
+        new_dynamic_array = DynamicArray()
+        index = 0
+        while index < self._capacity:
+            _, state, offset = self._read_bucket(index)
+            if state == _LIVE:
+                new_dynamic_array.append(self._read_record(offset))
+            index += 1
+        return new_dynamic_array
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing the underlying capacity.
+        """
+        self._rebuild_empty()
+
+    def _rebuild_empty(self) -> None:
+        """
+        Replaces the file with an empty table of the same capacity.
+        """
+        temporary_path = self._path + '.tmp'
+        self._create(temporary_path, self._capacity, 0)
+        with open(temporary_path, 'r+b') as file:
+            os.fsync(file.fileno())
+        self.close()
+        os.replace(temporary_path, self._path)
+        self._open()
+        self._version += 1
+
+    def __iter__(self):
+        """
+        Returns a new iterator over the live entries of the hash map, each as a HashEntry.
+        Each call has its own position, so several iterations can run at once.
+        Raises RuntimeError if a key is added or removed while iterating.
+        """
+        version = self._version
+
+        # The position lives in this generator rather than on the map
+        index = 0
+        while index < self._capacity:
+            hash, state, offset = self._read_bucket(index)
+            if state == _LIVE:
+                key, value = self._read_record(offset)
+                yield HashEntry(key, value, hash)
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+            index += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), 'example.hmoa')
+
+    print("\nFile-backed - put, then reopen")
+    print("------------------------------")
+    with HashMap(path, hash_function_1, 53) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+            if i % 25 == 24:
+                print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    with HashMap(path, hash_function_1, readonly=True) as m:
+        print(m.get_size(), m.get_capacity(), m.get('str42'), m.contains_key('str150'))
+
+    print("\nFile-backed - remove and iterate")
+    print("--------------------------------")
+    with HashMap(path, hash_function_1) as m:
+        m.clear()
+        for i in range(5):
+            m.put(str(i), str(i * 10))
+        m.remove('0')
+        m.remove('4')
+        for item in m:
+            print('K:', item.key, 'V:', item.value)
+
+    print("\nFile-backed - nested iteration and changes while iterating")
+    print("----------------------------------------------------------")
+    with HashMap(path, hash_function_1) as m:
+        # Every iteration has its own position, so the inner loop does not end the outer one
+        pairs = [(outer.key, inner.key) for outer in m for inner in m]
+        print(len(pairs), m.get_size() ** 2)
+        try:
+            for item in m:
+                m.put(item.key + '!', 0)
+        except RuntimeError as error:
+            print('RuntimeError:', error)
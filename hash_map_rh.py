@@ -0,0 +1,343 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A version of the HashMap class that uses open addressing with Robin Hood
+#              linear probing. On insert, an entry that is further from its home bucket
+#              takes the slot of an entry that is closer to its own, which keeps probe
+#              sequences short and even. Removal shifts the following entries back instead
+#              of leaving tombstones, so the table can safely run at load factors of 0.85-0.9.
+#              It has the same interface as the quadratic probing HashMap in hash_map_oa.py.
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+
+
+class HashMap:
+    def __init__(self, capacity: int, function, max_load: float = 0.875) -> None:
+        """
+        Initialize new HashMap that uses
+        Robin Hood linear probing for collision resolution.
+        The table doubles once the load factor would exceed max_load.
+        """
+        self._buckets = DynamicArray()
+
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        for _ in range(self._capacity):
+            self._buckets.append(None)
+
+        self._hash_function = function
+        self._size = 0
+        self._max_load = max_load
+
+        # Bumped whenever entries may move to other buckets, so iterators can tell the table changed
+        self._version = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._buckets.length()):
+            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _displacement(self, entry: HashEntry, index: int) -> int:
+        """
+        Returns how many buckets the entry stored at index sits past its home bucket.
+        """
+        return (index - entry.hash % self._capacity) % self._capacity
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or inserts a key/value pair into the hash map.
+        If the key is already in the hash map, replace its value.
+        If the key is not in the hash map, add a new entry.
+        """
+        # We resize before the insert would push the load factor past max_load
+        if (self._size + 1) / self._capacity > self._max_load:
+            self.resize_table(self._capacity * 2)
+
+        hash = self._hash_function(key)
+        index = hash % self._capacity
+        distance = 0
+
+        # We look for the key until we reach an empty bucket or an entry that is closer to
+        # its home than we are to ours; with Robin Hood ordering the key can't be further along
+        while True:
+            entry = self._buckets.get_at_index(index)
+            if entry is None:
+                break
+            if entry.hash == hash and entry.key == key:
+                # Key found; update its value
+                entry.value = value
+                return
+            if self._displacement(entry, index) < distance:
+                break
+            index = (index + 1) % self._capacity
+            distance += 1
+
+        # The key is new, so we insert it starting from the bucket where the search stopped
+        self._place(HashEntry(key, value, hash), index, distance)
+        self._size += 1
+        self._version += 1
+
+    def _place(self, entry: HashEntry, index: int, distance: int) -> None:
+        """
+        Inserts an entry whose key is known not to be in the table, starting at index,
+        which is distance buckets past its home. Whenever the entry is further from home
+        than the one occupying a bucket, the two are swapped and the displaced entry
+        continues probing.
+        """
+        while True:
+            current = self._buckets.get_at_index(index)
+            if current is None:
+                self._buckets.set_at_index(index, entry)
+                return
+
+            current_distance = self._displacement(current, index)
+            if current_distance < distance:
+                # Take from the rich (close to home) and give to the poor (far from home)
+                self._buckets.set_at_index(index, entry)
+                entry, distance = current, current_distance
+
+            index = (index + 1) % self._capacity
+            distance += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table and moves every entry into it.
+        If new_capacity would not fit all current entries within max_load, this does nothing.
+        """
+        if new_capacity < 1 or self._size > self._max_load * new_capacity:
+            return
+
+        new_capacity = self._next_prime(new_capacity)
+
+        old_buckets = self._buckets
+        old_capacity = self._capacity
+
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._capacity = new_capacity
+        self._version += 1
+
+        # Entries keep their stored hash, so we only need to place them
+        index = 0
+        while index < old_capacity:
+            entry = old_buckets.get_at_index(index)
+            if entry is not None:
+                self._place(entry, entry.hash % new_capacity, 0)
+            index += 1
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        There are no tombstones, so every bucket without a live entry is empty.
+        """
+        return self._capacity - self._size
+
+    def _find_index(self, key: str) -> int:
+        """
+        Returns the bucket index holding the given key, or -1 if the key is not in the table.
+        """
+        hash = self._hash_function(key)
+        index = hash % self._capacity
+        distance = 0
+
+        while True:
+            entry = self._buckets.get_at_index(index)
+            # An empty bucket, or an entry closer to home than we are, ends the search
+            if entry is None or self._displacement(entry, index) < distance:
+                return -1
+            if entry.hash == hash and entry.key == key:
+                return index
+            index = (index + 1) % self._capacity
+            distance += 1
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None.
+        """
+        index = self._find_index(key)
+        if index == -1:
+            return None
+        return self._buckets.get_at_index(index).value
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._find_index(key) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, this method does nothing.
+        """
+        index = self._find_index(key)
+        if index == -1:
+            return
+
+        # Backward shift deletion: every following entry that is not in its home bucket
+        # moves back by one, so no tombstone is needed to keep probe sequences intact
+        next_index = (index + 1) % self._capacity
+        entry = self._buckets.get_at_index(next_index)
+        while entry is not None and self._displacement(entry, next_index) > 0:
+            self._buckets.set_at_index(index, entry)
+            index = next_index
+            next_index = (index + 1) % self._capacity
+            entry = self._buckets.get_at_index(next_index)
+
+        self._buckets.set_at_index(index, None)
+        self._size -= 1
+        self._version += 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple (key, value)
+        for each key/value pair stored in the hash map.
+        """
+        new_dynamic_array = DynamicArray()
+        index = 0
+        while index < self._capacity:
+            entry = self._buckets.get_at_index(index)
+            if entry is not None:
+                new_dynamic_array.append((entry.key, entry.value))
+            index += 1
+        return new_dynamic_array
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing the underlying capacity.
+        """
+        index = 0
+        while index < self._capacity:
+            self._buckets.set_at_index(index, None)
+            index += 1
+        self._size = 0
+        self._version += 1
+
+    def probe_length_histogram(self) -> DynamicArray:
+        """
+        Returns a dynamic array where index d holds the number of entries stored
+        d buckets past their home bucket. A successful lookup of such an entry
+        inspects d + 1 buckets.
+        """
+        histogram = DynamicArray()
+        index = 0
+        while index < self._capacity:
+            entry = self._buckets.get_at_index(index)
+            if entry is not None:
+                distance = self._displacement(entry, index)
+                while histogram.length() <= distance:
+                    histogram.append(0)
+                histogram.set_at_index(distance, histogram.get_at_index(distance) + 1)
+            index += 1
+        return histogram
+
+    def __iter__(self):
+        """
+        Returns a new iterator over the HashEntry objects of the hash map.
+        Each call has its own position, so several iterations can run at once.
+        Raises RuntimeError if a key is added or removed while iterating, since Robin Hood
+        insertion and backward shift deletion move other entries.
+        """
+        version = self._version
+        buckets = self._buckets
+
+        # The position lives in this generator rather than on the map
+        index = 0
+        while index < self._capacity:
+            entry = buckets.get_at_index(index)
+            if entry is not None:
+                yield entry
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+            index += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nRobin Hood - put and probe lengths")
+    print("----------------------------------")
+    m = HashMap(53, hash_function_2)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    print(m.probe_length_histogram())
+
+    print("\nRobin Hood - remove with backward shift")
+    print("---------------------------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(9):
+        m.put(str(i), i * 10)
+    m.remove('0')
+    m.remove('4')
+    print(m.get_size(), m.get_capacity(), m.get('0'), m.get('5'), m.contains_key('8'))
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nRobin Hood - nested iteration and changes while iterating")
+    print("---------------------------------------------------------")
+    # Every iteration has its own position, so the inner loop does not end the outer one
+    pairs = [(outer.key, inner.key) for outer in m for inner in m]
+    print(len(pairs), m.get_size() ** 2)
+    try:
+        for item in m:
+            m.put(item.key + '!', 0)
+    except RuntimeError as error:
+        print('RuntimeError:', error)
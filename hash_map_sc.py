@@ -10,37 +10,122 @@
 #              The hash table itself will be stored in a DynamicArray.
 
 
-from a6_include import (DynamicArray, LinkedList,
-                        hash_function_1, hash_function_2)
+import math
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from a6_include import (DynamicArray, LinkedList, OperationCounters, SLNode, TreeBucket,
+                        hash_function_1, hash_function_2, hash_function_from_id,
+                        histogram_add, length_summary, random_siphash,
+                        read_dump_header, read_dump_records, write_dump)
+
+
+# 2^64 divided by the golden ratio, the multiplier of Fibonacci hashing
+_FIBONACCI = 0x9E3779B97F4A7C15
+_WORD_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+def _fibonacci_index(hash: int, capacity: int) -> int:
+    """
+    Returns the bucket of a hash in a power-of-two table by Fibonacci hashing: the hash is
+    multiplied by _FIBONACCI modulo 2^64 and the top log2(capacity) bits of the product are
+    kept. Every bit of a 64-bit hash affects those top bits. Copies of this formula are
+    inlined on hot paths, with 65 - capacity.bit_length() as the shift; keep them in step.
+    """
+    return ((hash * _FIBONACCI) & _WORD_MASK) >> (65 - capacity.bit_length())
 
 
 class HashMap:
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 migrate_step: int = 0,
+                 track_stats: bool = False,
+                 treeify_threshold: int = 8,
+                 flood_threshold: int = 0,
+                 capacity_policy: str = 'prime',
+                 shrink_load: float = 0.0) -> None:
         """
         Initialize new HashMap that uses
-        separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        separate chaining for collision resolution.
+        If migrate_step is positive, growing the table is done incrementally:
+        every put/get/remove moves at most migrate_step old buckets to the new table.
+        If track_stats is True, get hits/misses and resizes are counted for stats().
+        A chain that grows to treeify_threshold nodes becomes a TreeBucket, so lookups in it
+        are O(log n) even when a poor hash function sends many keys to one bucket; it goes
+        back to a LinkedList once it shrinks to 3/4 of that. 0 keeps every bucket a LinkedList.
+        If flood_threshold is positive, any insert (put, put_many, increment, ...) that leaves
+        a chain longer than that (a sign of keys crafted to collide) switches the map to SipHash
+        with a random secret of its own and rehashes every key in place; see _rekey().
+        capacity_policy 'prime' (the default) keeps the capacity a prime number and finds
+        buckets with hash % capacity; 'power_of_two' keeps it a power of two and finds
+        buckets by Fibonacci hashing, from the top bits of hash * 2^64/phi (see _home()).
+        If shrink_load is positive (e.g. 0.25), a removal that drops the load factor below it
+        shrinks the table; see _shrink(). It must be below 0.5.
         """
+        if capacity_policy not in ('prime', 'power_of_two'):
+            raise ValueError("capacity_policy must be 'prime' or 'power_of_two'")
+        if not 0 <= shrink_load < 0.5:
+            raise ValueError("shrink_load must be at least 0 and below 0.5")
+        self._power_of_two = capacity_policy == 'power_of_two'
+
         self._buckets = DynamicArray()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        # capacity must be a prime number (or a power of two under that policy)
+        self._capacity = self._table_size(capacity)
         for _ in range(self._capacity):
             self._buckets.append(LinkedList())
 
         self._hash_function = function
         self._size = 0
 
+        # A bucket only counts as part of the table while its entry in _epochs equals _epoch.
+        # clear() just moves to the next epoch, and buckets left from an earlier epoch
+        # are replaced by empty ones the first time they are touched.
+        self._epoch = 1
+        self._epochs = array('Q', [self._epoch]) * self._capacity
+
+        # The number of empty buckets is kept up to date by every insert and remove
+        self._empty = self._capacity
+
+        # While an incremental resize is in progress the old table is kept here and
+        # every old bucket below _migrate_index has already been moved to the new table.
+        # _migrate_pace is the number of old buckets each operation moves (see _start_migration()).
+        self._migrate_step = migrate_step
+        self._migrate_pace = migrate_step
+        self._old_buckets = None
+        self._old_epochs = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+
+        # Only allocated when statistics are enabled; a disabled map pays a single None check
+        self._counters = OperationCounters() if track_stats else None
+
+        # Bumped whenever nodes move to other buckets, so iterators can tell the table changed
+        self._version = 0
+
+        # Bucket lengths at which a LinkedList becomes a TreeBucket and back; -1 never matches a length
+        self._treeify_at = treeify_threshold if treeify_threshold > 0 else -1
+        self._untreeify_at = treeify_threshold * 3 // 4 if treeify_threshold > 0 else -1
+
+        # 0 once the map has switched to a keyed hash, since there is nothing left to switch to
+        self._flood_threshold = flood_threshold
+
+        # Shrinking never takes the table below the capacity it was created with or reserve()d
+        self._shrink_load = shrink_load
+        self._min_capacity = self._capacity
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Buckets from before the last clear() are shown empty.
         """
         out = ''
         for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+            bucket = self._buckets[i] if self._epochs[i] == self._epoch else LinkedList()
+            out += str(i) + ': ' + str(bucket) + '\n'
         return out
 
     def _next_prime(self, capacity: int) -> int:
@@ -76,6 +161,24 @@ class HashMap:
 
         return True
 
+    def _table_size(self, capacity: int) -> int:
+        """
+        Returns the smallest capacity allowed by the capacity policy that is at least the given one
+        """
+        if self._power_of_two:
+            return 1 << max(capacity - 1, 0).bit_length()
+        return self._next_prime(capacity)
+
+    def _home(self, hash: int, capacity: int) -> int:
+        """
+        Returns the index of the bucket for a hash in a table with the given capacity.
+        A power-of-two table uses Fibonacci (multiplicative) hashing instead, see
+        _fibonacci_index(), so that high bits of the hash matter as much as low ones.
+        """
+        if self._power_of_two:
+            return _fibonacci_index(hash, capacity)
+        return hash % capacity
+
     def get_size(self) -> int:
         """
         Return size of map
@@ -98,22 +201,45 @@ class HashMap:
         Resizes the hash table if the load factor is greater than or equal to 1.0.
         """
 
-        # we need to check if hash table needs to resize
-        if self.table_load() >= 1.0:
-            self.resize_table(self.get_capacity() * 2)
+        self._make_room()
 
         # We use the hash function to generate a hash value for the key,
         # then use the modulus operator with the table capacity
         # to make sure the index falls within the valid range of buckets.
         # All so we can retrieve a linked list at the computed index.
-        linked_list = self._buckets[self._hash_function(key) % self.get_capacity()]
+        # The full hash is kept so it is stored alongside the key and never recomputed.
+        hash = self._hash_function(key)
+        linked_list = self._bucket(hash)
 
         # We use the contains() method of the LinkedList to check if the key already exists in the bucket
-        if linked_list.contains(key):
-            linked_list.contains(key).value = value  # If the key is found, we update its value
+        node = linked_list.contains(key, hash)
+        if node:
+            node.value = value  # If the key is found, we update its value
         else:  # Otherwise we insert a new node into the bucket and increase the size of the hash map
-            linked_list.insert(key, value)
+            if linked_list.length() == 0 and not self._in_old_table(hash):
+                self._empty -= 1
+            linked_list.insert(key, value, hash)
             self._size += 1
+            if linked_list.length() == self._treeify_at:
+                self._adapt_bucket(hash, linked_list)
+            if self._flood_threshold and linked_list.length() > self._flood_threshold:
+                self._rekey()
+
+    def _make_room(self) -> None:
+        """
+        Does the work put() does before a key may be added: one step of an incremental
+        resize, and growing the table once the load factor reaches 1.0.
+        """
+        self._migrate()
+
+        # we need to check if hash table needs to resize
+        if self.table_load() >= 1.0:
+            if self._migrate_step > 0:
+                # A running resize always ends before the load factor gets back to 1.0
+                # (see _start_migration()), so there is none to finish here
+                self._start_migration(self.get_capacity() * 2)
+            else:
+                self.resize_table(self.get_capacity() * 2)
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -125,9 +251,15 @@ class HashMap:
         if new_capacity < 1:
             return
 
+        # An explicit resize rehashes everything at once, so we complete any incremental one first
+        self._finish_migration()
+
+        if self._counters is not None:
+            started = time.perf_counter()
+
         # We make sure the new hash table capacity is the smallest prime number
         # that’s at least as large as the specified capacity
-        new_capacity = self._next_prime(new_capacity)
+        new_capacity = self._table_size(new_capacity)
 
         # We create a new DynamicArray to hold the resized table
         new_buckets = DynamicArray()
@@ -137,18 +269,182 @@ class HashMap:
             new_buckets.append(LinkedList())
             i += 1
 
-        # Rehash all existing key-value pairs from the old table into the new table.
+        # Rehash all existing key-value pairs from the old table into the new table,
+        # skipping buckets left over from before the last clear()
+        empty = new_capacity
         i = 0
         while i < self.get_capacity():
-            for node in self._buckets.get_at_index(i):
-                # Recompute the new index for each key using the updated capacity.
-                new_index = self._hash_function(node.key) % new_capacity
-                new_buckets.get_at_index(new_index).insert(node.key, node.value)
+            if self._epochs[i] == self._epoch:
+                for node in self._buckets.get_at_index(i):
+                    # Compute the new index for each key from its stored hash using the updated capacity.
+                    # The node itself is moved, so nothing is allocated and references to it stay valid.
+                    new_index = self._home(node.hash, new_capacity)
+                    new_bucket = new_buckets.get_at_index(new_index)
+                    if new_bucket.length() == 0:
+                        empty -= 1
+                    new_bucket.push(node)
+                    if new_bucket.length() == self._treeify_at:
+                        new_buckets.set_at_index(new_index, TreeBucket(new_bucket))
             i += 1
 
         # Finally, we replace the old table with the new table
         self._buckets = new_buckets
+        self._epochs = array('Q', [self._epoch]) * new_capacity
+        self._capacity = new_capacity
+        self._empty = empty
+        self._version += 1
+
+        if self._counters is not None:
+            self._counters.resizes += 1
+            self._counters.resize_seconds += time.perf_counter() - started
+
+    def _bucket(self, hash: int) -> LinkedList:
+        """
+        Returns the bucket that holds (or would hold) a key with the given hash.
+        During an incremental resize, keys whose old bucket has not been moved yet
+        are still found in the old table.
+        """
+        if self._old_buckets is not None:
+            old_index = self._home(hash, self._old_capacity)
+            if old_index >= self._migrate_index:
+                return self._current_bucket(self._old_buckets, self._old_epochs, old_index)
+
+        # Buckets are usually from the current epoch, so we find and check them here without a call
+        if self._power_of_two:
+            index = ((hash * _FIBONACCI) & _WORD_MASK) >> (65 - self._capacity.bit_length())
+        else:
+            index = hash % self._capacity
+        if self._epochs[index] == self._epoch:
+            return self._buckets.get_at_index(index)
+        return self._current_bucket(self._buckets, self._epochs, index)
+
+    def _in_old_table(self, hash: int) -> bool:
+        """
+        Returns True if a key with the given hash lives in the old table of an
+        incremental resize. Only buckets of the current table count for empty_buckets().
+        """
+        return self._old_buckets is not None and self._home(hash, self._old_capacity) >= self._migrate_index
+
+    def _current_bucket(self, buckets: DynamicArray, epochs: array, index: int) -> LinkedList:
+        """
+        Returns the bucket at the given index of a table. A bucket from an earlier epoch
+        (or one not created yet) is first replaced by an empty LinkedList.
+        """
+        if epochs[index] != self._epoch:
+            bucket = LinkedList()
+            buckets.set_at_index(index, bucket)
+            epochs[index] = self._epoch
+            return bucket
+        return buckets.get_at_index(index)
+
+    def _adapt_bucket(self, hash: int, bucket) -> None:
+        """
+        Called when the bucket holding keys with the given hash has just grown to the treeify
+        threshold or shrunk to the untreeify threshold: a long LinkedList is replaced by a
+        TreeBucket holding the same nodes, and a short TreeBucket by a LinkedList.
+        """
+        length = bucket.length()
+        if length >= self._treeify_at and isinstance(bucket, LinkedList):
+            bucket = TreeBucket(bucket)
+        elif length <= self._untreeify_at and isinstance(bucket, TreeBucket):
+            bucket = bucket.to_linked_list()
+        else:
+            return
+
+        if self._in_old_table(hash):
+            self._old_buckets.set_at_index(self._home(hash, self._old_capacity), bucket)
+        else:
+            self._buckets.set_at_index(self._home(hash, self._capacity), bucket)
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        Allocates the new table and starts moving buckets into it incrementally.
+        The new table starts with every bucket marked as from an earlier epoch, so its
+        LinkedLists are only created when first used and starting the resize does not
+        cost O(capacity) either.
+        """
+        new_capacity = self._table_size(new_capacity)
+
+        # The current table becomes the old one; lookups consult both until it is drained
+        self._old_buckets = self._buckets
+        self._old_epochs = self._epochs
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
+        self._buckets = DynamicArray([None] * new_capacity)
+        self._epochs = array('Q', bytes(8 * new_capacity))
         self._capacity = new_capacity
+        self._empty = new_capacity
+        self._version += 1
+
+        # Every insert moves at least _migrate_pace old buckets, so this pace drains the old
+        # table before the inserts still allowed at this capacity have all been made; the
+        # next resize then never has to wait for this one
+        headroom = max(new_capacity - self._size, 1)
+        self._migrate_pace = max(self._migrate_step, -(-self._old_capacity // headroom))
+
+        if self._counters is not None:
+            self._counters.resizes += 1
+
+    def _migrate(self, step: int = None) -> None:
+        """
+        Moves up to step old buckets (the pace of the running resize by default) into the
+        new table. Does nothing if no incremental resize is in progress.
+        """
+        if self._old_buckets is None:
+            return
+        if step is None:
+            step = self._migrate_pace
+        if self._counters is not None:
+            started = time.perf_counter()
+
+        stop = min(self._migrate_index + step, self._old_capacity)
+        while self._migrate_index < stop:
+            if self._old_epochs[self._migrate_index] == self._epoch:
+                for node in self._old_buckets.get_at_index(self._migrate_index):
+                    # Stored hashes mean the keys never have to be hashed again
+                    new_index = self._home(node.hash, self._capacity)
+                    new_bucket = self._current_bucket(self._buckets, self._epochs, new_index)
+                    if new_bucket.length() == 0:
+                        self._empty -= 1
+                    new_bucket.push(node)
+                    if new_bucket.length() == self._treeify_at:
+                        self._buckets.set_at_index(new_index, TreeBucket(new_bucket))
+            # Drop the moved bucket so its nodes can be reclaimed
+            self._old_buckets.set_at_index(self._migrate_index, None)
+            self._migrate_index += 1
+
+        # Once every bucket has been moved the old table is released
+        if self._migrate_index == self._old_capacity:
+            self._old_buckets = None
+            self._old_epochs = None
+            self._old_capacity = 0
+            self._migrate_index = 0
+
+        # Time spent moving buckets counts towards the resize that started it
+        if self._counters is not None:
+            self._counters.resize_seconds += time.perf_counter() - started
+
+    def _finish_migration(self) -> None:
+        """
+        Moves every remaining old bucket at once, completing an incremental resize.
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+    def _rekey(self) -> None:
+        """
+        Switches the map to SipHash with a random secret and rehashes every key in place,
+        keeping the capacity. The nodes are moved, not copied. Keys crafted to collide under
+        a predictable hash function are spread out again, and without the secret an attacker
+        cannot craft new ones.
+        """
+        self._finish_migration()
+        self._hash_function = function = random_siphash()
+        self._flood_threshold = 0
+
+        for node in self._nodes():
+            node.hash = function(node.key)
+        self.resize_table(self._capacity)
 
     def table_load(self) -> float:
         """
@@ -158,39 +454,50 @@ class HashMap:
 
     def empty_buckets(self) -> int:
         """
-        Calculates and returns the number of empty LinkedLists in the hash table.
+        Returns the number of empty LinkedLists in the hash table.
+        The count is kept up to date by every insert and remove, so no walk is needed.
+        While an incremental resize is running, the result is the count the resize will
+        end with: the keys still waiting in the old table are walked (without moving them)
+        to find the empty buckets of the new table they are going to fill.
         """
-        # We start track of how many buckets have no elements
-        empty_buckets_count = 0
-        index = 0
-
-        # Go through each bucket in the hash table
-        while index < self.get_capacity():
-            # We ger the linked list at the current index
-            current_bucket = self._buckets.get_at_index(index)
-            # If this linked list has no elements, we increase the counter
-            if current_bucket.length() == 0:
-                empty_buckets_count += 1
-            index += 1  # Move to the next bucket
-
-        return empty_buckets_count
+        if self._old_buckets is None:
+            return self._empty
+
+        filled = set()
+        index = self._migrate_index
+        while index < self._old_capacity:
+            if self._old_epochs[index] == self._epoch:
+                for node in self._old_buckets.get_at_index(index):
+                    new_index = self._home(node.hash, self._capacity)
+                    if self._epochs[new_index] != self._epoch or self._buckets.get_at_index(new_index).length() == 0:
+                        filled.add(new_index)
+            index += 1
+        return self._empty - len(filled)
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the given key.
         If the key is not in the hash map, returns None.
         """
-        # First, we calculate the index where the key should be located
-        index = self._hash_function(key) % self.get_capacity()
+        self._migrate()
+
+        # First, we calculate the hash that determines where the key should be located
+        hash = self._hash_function(key)
 
-        # We get the LinkedList at the computed index
-        current_bucket = self._buckets.get_at_index(index)
+        # We get the LinkedList for that hash
+        current_bucket = self._bucket(hash)
 
-        # Search the bucket for the key using its contains method
-        if current_bucket.contains(key):
+        # Search the bucket for the key using its contains method,
+        # comparing stored hashes before comparing keys
+        node = current_bucket.contains(key, hash)
+        if node:
+            if self._counters is not None:
+                self._counters.hits += 1
             # If we found the key, return its associated value
-            return current_bucket.contains(key).value
+            return node.value
 
+        if self._counters is not None:
+            self._counters.misses += 1
         # If we didn't find the key, return None
         return None
 
@@ -199,16 +506,7 @@ class HashMap:
         Checks if the given key exists in the hash map.
         Returns True if the key is found, otherwise False.
         """
-
-        index = self._hash_function(key) % self.get_capacity()
-        current_bucket = self._buckets.get_at_index(index)
-
-        # Use the LinkedList's contains method to see if the key exists
-        if current_bucket.contains(key):
-            # If the key is found, we return True
-            return True
-
-        return False
+        return self._find_node(key) is not None
 
     def remove(self, key: str) -> None:
         """
@@ -216,13 +514,21 @@ class HashMap:
         If the key is not in the hash map, does nothing.
         """
 
-        index = self._hash_function(key) % self.get_capacity()
-        current_bucket = self._buckets.get_at_index(index)
+        self._migrate()
+
+        hash = self._hash_function(key)
+        current_bucket = self._bucket(hash)
 
         # We remove the key from the bucket using the remove method of the LinkedList
-        if current_bucket.remove(key):
+        if current_bucket.remove(key, hash):
             # after removing we decrease the size of the hash map
             self._size -= 1
+            if current_bucket.length() == 0 and not self._in_old_table(hash):
+                self._empty += 1
+            elif current_bucket.length() == self._untreeify_at:
+                self._adapt_bucket(hash, current_bucket)
+            if self._shrink_load and self._size < self._shrink_load * self._capacity:
+                self._shrink()
 
         # If the key wasn't found, we just do nothing
 
@@ -231,19 +537,23 @@ class HashMap:
         Returns a dynamic array containing all key-value pairs stored in the hash map.
         Each index of the array contains a tuple (key, value).
         """
+        self._finish_migration()
+
         # We need to make a new dynamic array to store the key-value pairs
         key_value_pairs = DynamicArray()
 
         # We start with the first bucket and work our way through
         index = 0
         while index < self.get_capacity():
-            # Get the bucket (a LinkedList) at the current index
-            current_bucket = self._buckets.get_at_index(index)
+            # Buckets from before the last clear() hold nothing
+            if self._epochs[index] == self._epoch:
+                # Get the bucket (a LinkedList) at the current index
+                current_bucket = self._buckets.get_at_index(index)
 
-            # Now, we loop through each node in the bucket
-            for node in current_bucket:
-                # And add the key and value as a tuple to our result array
-                key_value_pairs.append((node.key, node.value))
+                # Now, we loop through each node in the bucket
+                for node in current_bucket:
+                    # And add the key and value as a tuple to our result array
+                    key_value_pairs.append((node.key, node.value))
 
             index += 1
 
@@ -253,15 +563,463 @@ class HashMap:
     def clear(self) -> None:
         """
         Clears the contents of the hash map without changing the underlying hash table capacity.
+        Runs in O(1): moving to the next epoch makes every bucket count as empty,
+        and each one is replaced by a new LinkedList the next time it is touched.
         """
-        # We need to reset the size to zero
+        # We need to reset the size to zero, and an unfinished incremental resize can simply be dropped
         self._size = 0
+        self._old_buckets = None
+        self._old_epochs = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+        self._epoch += 1
+        self._empty = self._capacity
+        self._version += 1
+
+    def stats(self) -> dict:
+        """
+        Returns a snapshot of the table's shape and, if the map was created with
+        track_stats=True, its operation counters (otherwise those are None):
+        chain_histogram  - DynamicArray where index n holds the number of buckets with n nodes
+        chain_mean, chain_max, chain_p99 - over the non-empty buckets
+        tombstones       - always 0, separate chaining never leaves tombstones
+        resizes, resize_seconds, hits, misses - operation counters
+        Building the snapshot walks the whole table.
+        """
+        self._finish_migration()
+
+        histogram = DynamicArray()
         index = 0
-        # We loop through each bucket
-        while index < self.get_capacity():
-            # And replace the linked list at the current index with a new empty LinkedList
-            self._buckets.set_at_index(index, LinkedList())
+        while index < self._capacity:
+            if self._epochs[index] == self._epoch:
+                histogram_add(histogram, self._buckets.get_at_index(index).length())
+            else:
+                histogram_add(histogram, 0)
             index += 1
+        mean, longest, p99 = length_summary(histogram)
+
+        counters = self._counters
+        return {
+            'size': self._size,
+            'capacity': self._capacity,
+            'load': self.table_load(),
+            'chain_histogram': histogram,
+            'chain_mean': mean,
+            'chain_max': longest,
+            'chain_p99': p99,
+            'tombstones': 0,
+            'resizes': counters.resizes if counters else None,
+            'resize_seconds': counters.resize_seconds if counters else None,
+            'hits': counters.hits if counters else None,
+            'misses': counters.misses if counters else None,
+        }
+
+    # ------------------------------ SIZING ------------------------------ #
+
+    @classmethod
+    def with_expected_size(cls, n: int, max_load: float = 1.0,
+                           function: callable = hash_function_1, **options) -> "HashMap":
+        """
+        Returns an empty HashMap whose table holds n keys at a load factor of at most max_load,
+        so inserting them never resizes it. max_load may not exceed 1.0, the load factor
+        at which put() grows the table. Other keyword arguments go to the constructor.
+        """
+        if not 0 < max_load <= 1.0:
+            raise ValueError("max_load must be above 0 and at most 1.0")
+        return cls(math.ceil(n / max_load), function, **options)
+
+    def reserve(self, n: int) -> None:
+        """
+        Makes room for n keys in total (not n more), so the hash map can grow to n keys
+        without resizing. Shrinking will not take the table below that size either.
+        Does nothing to a table that is already large enough.
+        """
+        self._min_capacity = max(self._min_capacity, self._table_size(n))
+        if n > self._capacity:
+            self.resize_table(n)
+
+    def _shrink(self) -> None:
+        """
+        Called once a removal drops the load factor below shrink_load: resizes the table to a
+        load factor of 0.5, but not below the capacity it was created with or reserved.
+        Since the table grows at 1.0, the size has to halve again (roughly) or double before
+        the next resize, so a map whose size hovers around a threshold does not thrash.
+        """
+        new_capacity = self._table_size(max(2 * self._size, self._min_capacity))
+        if new_capacity < self._capacity:
+            self.resize_table(new_capacity)
+
+    # ------------------------ COMPOUND OPERATIONS ------------------------ #
+
+    def _find_node(self, key: str, hash: int = None) -> SLNode:
+        """
+        Returns the node holding the given key, or None if the key is not in the hash map.
+        The key is only hashed if its hash is not given.
+        """
+        if hash is None:
+            hash = self._hash_function(key)
+
+        # Use the LinkedList's contains method to see if the key exists
+        return self._bucket(hash).contains(key, hash)
+
+    def _find_or_insert(self, key: str, value: object, hash: int = None,
+                        node_class: type = None) -> tuple:
+        """
+        Returns (node, inserted) for the given key after hashing it and walking its chain once.
+        If the key is not in the hash map, a node holding value is added first;
+        node_class may be an SLNode subclass carrying extra attributes (see cache_map.py).
+        The key is only hashed if its hash is not given.
+        """
+        self._make_room()
+
+        if hash is None:
+            hash = self._hash_function(key)
+        bucket = self._bucket(hash)
+        node = bucket.contains(key, hash)
+        if node:
+            return node, False
+
+        if bucket.length() == 0 and not self._in_old_table(hash):
+            self._empty -= 1
+        self._size += 1
+        if node_class is not None:
+            node = bucket.push(node_class(key, value, None, hash))
+        else:
+            node = bucket.insert(key, value, hash)
+        if bucket.length() == self._treeify_at:
+            self._adapt_bucket(hash, bucket)
+        if self._flood_threshold and bucket.length() > self._flood_threshold:
+            # The node is moved, not copied, so it is still the one holding the key
+            self._rekey()
+        return node, True
+
+    def setdefault(self, key: str, default: object = None) -> object:
+        """
+        Returns the value of the given key. If the key is not in the hash map,
+        it is added with the default value first.
+        """
+        node, _ = self._find_or_insert(key, default)
+        return node.value
+
+    def increment(self, key: str, delta: int = 1) -> int:
+        """
+        Adds delta to the value of the given key and returns the new value.
+        A key that is not in the hash map starts at 0.
+        """
+        node, inserted = self._find_or_insert(key, delta)
+        if not inserted:
+            node.value += delta
+        return node.value
+
+    def update_with(self, key: str, fn: callable) -> object:
+        """
+        Replaces the value of the given key with fn(value) and returns the new value.
+        For a key that is not in the hash map, fn(None) is stored.
+        If fn raises, the hash map is left unchanged.
+        """
+        hash = self._hash_function(key)
+        node = self._find_node(key, hash)
+        if node:
+            node.value = fn(node.value)
+            return node.value
+
+        # fn runs before anything is added or resized, so if it raises there is nothing to undo
+        value = fn(None)
+        node, _ = self._find_or_insert(key, value, hash)
+        node.value = value
+        return value
+
+    def pop(self, key: str, default: object = None) -> object:
+        """
+        Removes the given key from the hash map and returns its value.
+        If the key is not in the hash map, returns default.
+        """
+        node = self._pop_node(key)
+        if node is None:
+            return default
+        return node.value
+
+    def _pop_node(self, key: str, hash: int = None) -> SLNode:
+        """
+        Unlinks the node holding the given key and returns it, or None if the key is not in the hash map.
+        The key is only hashed if its hash is not given.
+        """
+        self._migrate()
+
+        if hash is None:
+            hash = self._hash_function(key)
+        bucket = self._bucket(hash)
+        node = bucket.pop(key, hash)
+        if node is None:
+            return None
+
+        self._size -= 1
+        if bucket.length() == 0 and not self._in_old_table(hash):
+            self._empty += 1
+        elif bucket.length() == self._untreeify_at:
+            self._adapt_bucket(hash, bucket)
+        if self._shrink_load and self._size < self._shrink_load * self._capacity:
+            self._shrink()
+        return node
+
+    def merge_entries(self, entries, combine: callable) -> None:
+        """
+        Adds every (key, hash, value) from an iterable, where hash is the key's hash under
+        this map's hash function (e.g. stored in another map's nodes), so no key is hashed.
+        A key that is already present gets combine(current value, value) as its value.
+        """
+        function = self._hash_function
+        for key, hash, value in entries:
+            # After a rekey the given hashes are for the old hash function, so we hash the key
+            if self._hash_function is not function:
+                hash = None
+            node, inserted = self._find_or_insert(key, value, hash)
+            if not inserted:
+                node.value = combine(node.value, value)
+
+    # ----------------------------- ITERATION ----------------------------- #
+
+    def _nodes(self):
+        """
+        Yields every node of the hash map, bucket by bucket, straight from the table.
+        Raises RuntimeError if the table is resized or cleared while iterating, since
+        nodes would then be skipped or seen twice.
+        """
+        self._finish_migration()
+        version = self._version
+        buckets, epochs, epoch = self._buckets, self._epochs, self._epoch
+        index = 0
+        while index < self._capacity:
+            if epochs[index] == epoch:
+                for node in buckets.get_at_index(index):
+                    yield node
+                    if self._version != version:
+                        raise RuntimeError("HashMap changed size during iteration")
+            index += 1
+
+    def __iter__(self):
+        """
+        Returns a new iterator over the nodes (with key and value attributes) of the hash map.
+        Each call has its own position, so several iterations can run at once.
+        """
+        return self._nodes()
+
+    def keys(self):
+        """
+        Yields every key in the hash map without building a list of them first.
+        """
+        for node in self._nodes():
+            yield node.key
+
+    def values(self):
+        """
+        Yields every value in the hash map without building a list of them first.
+        """
+        for node in self._nodes():
+            yield node.value
+
+    def items(self):
+        """
+        Yields a (key, value) tuple for every key in the hash map
+        without building a list of them first.
+        """
+        for node in self._nodes():
+            yield node.key, node.value
+
+    # ------------------------- BATCH OPERATIONS ------------------------- #
+
+    @staticmethod
+    def _as_list(items) -> list:
+        """
+        Returns the items of a DynamicArray or any other iterable as a list,
+        so a batch can be measured and walked more than once.
+        """
+        if isinstance(items, DynamicArray):
+            return [items.get_at_index(index) for index in range(items.length())]
+        if isinstance(items, list):
+            return items
+        return list(items)
+
+    def _hash_many(self, keys: list) -> list:
+        """
+        Returns the hashes of all keys at once, using the hash function's own
+        hash_many() batch method when it provides one.
+        """
+        hash_many = getattr(self._hash_function, 'hash_many', None)
+        if hash_many is not None:
+            return hash_many(keys)
+        function = self._hash_function
+        return [function(key) for key in keys]
+
+    def _bucket_finder(self) -> callable:
+        """
+        Returns a function from a hash to its bucket, like _bucket(). Outside of an incremental
+        resize every key maps straight to a bucket of the table, so the returned function skips
+        the old table; it is only valid until the table next changes.
+        """
+        if self._old_buckets is not None:
+            return self._bucket
+
+        current_bucket, buckets, epochs = self._current_bucket, self._buckets, self._epochs
+        capacity = self._capacity
+        if self._power_of_two:
+            shift = 65 - capacity.bit_length()
+            return lambda hash: current_bucket(buckets, epochs, ((hash * _FIBONACCI) & _WORD_MASK) >> shift)
+        return lambda hash: current_bucket(buckets, epochs, hash % capacity)
+
+    def put_many(self, pairs) -> None:
+        """
+        Updates or inserts every (key, value) pair from an iterable (or DynamicArray).
+        The table is sized once for the keys of the batch that are not in it yet,
+        so no resize happens partway through.
+        """
+        pairs = self._as_list(pairs)
+        if not pairs:
+            return
+
+        keys = [pair[0] for pair in pairs]
+        hashes = self._hash_many(keys)
+
+        # We look every key up first. Nodes are moved, not copied, when the table changes,
+        # so the ones we find can be updated after resizing.
+        find_bucket = self._bucket_finder()
+        nodes = [find_bucket(hash).contains(key, hash) for key, hash in zip(keys, hashes)]
+
+        # Only the keys we did not find are new; the load must stay below 1.0 until the last insert
+        needed = self._size + nodes.count(None)
+        if needed > self._capacity:
+            self.resize_table(needed)
+        else:
+            self._migrate(len(pairs) * self._migrate_pace)
+        find_bucket = self._bucket_finder()
+
+        inserted = 0
+        index = 0
+        while index < len(pairs):
+            key, value = pairs[index]
+            hash = hashes[index]
+            node = nodes[index]
+            index += 1
+            if node is not None:
+                node.value = value
+                continue
+
+            # The key may also have been inserted earlier in this batch
+            bucket = find_bucket(hash)
+            node = bucket.contains(key, hash)
+            if node:
+                node.value = value
+            else:
+                if bucket.length() == 0 and not self._in_old_table(hash):
+                    self._empty -= 1
+                bucket.insert(key, value, hash)
+                inserted += 1
+                if bucket.length() == self._treeify_at:
+                    self._adapt_bucket(hash, bucket)
+                if self._flood_threshold and bucket.length() > self._flood_threshold:
+                    # The hashes and buckets above are for the old hash function,
+                    # so the rest of the batch starts over after the rekey
+                    self._size += inserted
+                    self._rekey()
+                    self.put_many(pairs[index:])
+                    return
+        self._size += inserted
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a DynamicArray holding the value for each of the given keys,
+        in the same order, with None for keys that are not in the hash map.
+        """
+        keys = self._as_list(keys)
+        self._migrate(len(keys) * self._migrate_pace)
+        find_bucket = self._bucket_finder()
+
+        values = []
+        hits = 0
+        for key, hash in zip(keys, self._hash_many(keys)):
+            node = find_bucket(hash).contains(key, hash)
+            if node:
+                values.append(node.value)
+                hits += 1
+            else:
+                values.append(None)
+
+        if self._counters is not None:
+            self._counters.hits += hits
+            self._counters.misses += len(keys) - hits
+        return DynamicArray(values)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes each of the given keys from the hash map; keys that are not present are ignored.
+        """
+        keys = self._as_list(keys)
+        self._migrate(len(keys) * self._migrate_pace)
+
+        for key, hash in zip(keys, self._hash_many(keys)):
+            bucket = self._bucket(hash)
+            if bucket.remove(key, hash):
+                self._size -= 1
+                if bucket.length() == 0 and not self._in_old_table(hash):
+                    self._empty += 1
+                elif bucket.length() == self._untreeify_at:
+                    self._adapt_bucket(hash, bucket)
+                if self._shrink_load and self._size < self._shrink_load * self._capacity:
+                    self._shrink()
+
+    # --------------------------- SERIALIZATION --------------------------- #
+
+    def dump(self, fileobj) -> None:
+        """
+        Writes the hash map to a binary file object in the compact format of
+        a6_include.write_dump(). Records are streamed out bucket by bucket.
+        Keys must be strings; values are pickled.
+        """
+        self._finish_migration()
+        write_dump(fileobj, self._capacity, self._dump_pairs(), self._size, self._hash_function)
+
+    def _dump_pairs(self):
+        """
+        Yields every (key, value) pair, each chain from its tail to its head.
+        load() inserts at the head, so a map loaded at the same capacity has the same chain order.
+        """
+        index = 0
+        while index < self._capacity:
+            if self._epochs[index] == self._epoch:
+                chain = [(node.key, node.value) for node in self._buckets.get_at_index(index)]
+                yield from reversed(chain)
+            index += 1
+
+    @classmethod
+    def load(cls, fileobj, function: callable = None) -> "HashMap":
+        """
+        Reads a hash map written by dump() from a binary file object.
+        The hash function is looked up from the id stored in the dump unless one is given.
+        The table is sized once up front and the pairs are inserted without any
+        load factor or duplicate checks, since a dump holds each key exactly once.
+        """
+        capacity, size, function_id = read_dump_header(fileobj)
+        if function is None:
+            function = hash_function_from_id(function_id)
+
+        hash_map = cls(capacity, function)
+        if size > hash_map._capacity:
+            hash_map.resize_table(size)
+
+        get_bucket, capacity = hash_map._buckets.get_at_index, hash_map._capacity
+        empty = capacity
+        for key, value in read_dump_records(fileobj, size):
+            hash = function(key)
+            index = hash_map._home(hash, capacity)
+            bucket = get_bucket(index)
+            if bucket.length() == 0:
+                empty -= 1
+            bucket.insert(key, value, hash)
+            if bucket.length() == hash_map._treeify_at:
+                hash_map._buckets.set_at_index(index, TreeBucket(bucket))
+        hash_map._size = size
+        hash_map._empty = empty
+        return hash_map
 
 
 def find_mode(arr: DynamicArray) -> tuple[DynamicArray, int]:
@@ -278,16 +1036,9 @@ def find_mode(arr: DynamicArray) -> tuple[DynamicArray, int]:
     # First pass: Build the frequency map and determine the highest frequency
     while index < arr.length():
         current_value = arr.get_at_index(index)
-        # Get the current frequency of the value from the frequency tracker
-        freq = frequency_tracker.get(current_value)
-        if freq is None:
-            # If it's the first time we've seen this value, we initialize its frequency to 1
-            frequency_tracker.put(current_value, 1)
-            freq = 1
-        else:
-            # If we've seen this value before, we increment its frequency
-            freq += 1
-            frequency_tracker.put(current_value, freq)
+        # increment() starts a value we haven't seen at 1 and adds 1 to one we have,
+        # hashing the value and walking its chain only once
+        freq = frequency_tracker.increment(current_value)
 
         # Update highest_frequency if the current frequency exceeds it
         if freq > highest_frequency:
@@ -309,10 +1060,82 @@ def find_mode(arr: DynamicArray) -> tuple[DynamicArray, int]:
     return modes, highest_frequency
 
 
+def _count_chunk(values, offset: int) -> list:
+    """
+    Runs in a worker process of find_mode_parallel(): counts the values of one chunk, which
+    starts at position offset of the whole input, in a HashMap like find_mode()'s.
+    Returns a (key, hash, [count, position of first occurrence]) tuple per distinct value.
+    """
+    if hasattr(values, 'tolist'):
+        values = values.tolist()
+
+    frequency_tracker = HashMap()
+    position = offset
+    for value in values:
+        node, inserted = frequency_tracker._find_or_insert(value, None)
+        if inserted:
+            node.value = [1, position]
+        else:
+            node.value[0] += 1
+        position += 1
+    return [(node.key, node.hash, node.value) for node in frequency_tracker._nodes()]
+
+
+def find_mode_parallel(arr, workers: int = None) -> tuple[DynamicArray, int]:
+    """
+    Same result as find_mode(arr), including the order of the modes, with the counting
+    split over worker processes. arr may be a DynamicArray or any sequence that supports
+    len() and slicing, such as a list or a NumPy array.
+    Each worker counts one contiguous chunk in its own HashMap. The partial counts are
+    merged by distinct value using the hashes the workers stored, so no value is hashed
+    again, and the first occurrence of each value is kept so the merged map can be
+    rebuilt exactly as find_mode() builds its map.
+    """
+    if isinstance(arr, DynamicArray):
+        arr = [arr.get_at_index(index) for index in range(arr.length())]
+    length = len(arr)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunk_size = max(-(-length // workers), 1)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_count_chunk, arr[start:start + chunk_size], start)
+                   for start in range(0, length, chunk_size)]
+
+        # Counts add up and the earliest first occurrence wins
+        merged = HashMap()
+        for future in futures:
+            merged.merge_entries(future.result(),
+                                 lambda current, new: [current[0] + new[0], min(current[1], new[1])])
+
+    # find_mode() adds each value at its first occurrence and grows the table before any
+    # element once the load factor reaches 1.0. Adding the values in order of first
+    # occurrence (and growing once more if any element came after the last new value)
+    # goes through the same resizes, so the buckets and their order come out the same.
+    distinct = sorted(merged._nodes(), key=lambda node: node.value[1])
+    frequency_tracker = HashMap()
+    highest_frequency = 0
+    for node in distinct:
+        count = node.value[0]
+        frequency_tracker._find_or_insert(node.key, count, node.hash)
+        if count > highest_frequency:
+            highest_frequency = count
+    if distinct and distinct[-1].value[1] < length - 1:
+        frequency_tracker._make_room()
+
+    modes = DynamicArray()
+    for node in frequency_tracker._nodes():
+        if node.value == highest_frequency:
+            modes.append(node.key)
+    return modes, highest_frequency
+
+
 # ------------------- BASIC TESTING ---------------------------------------- #
 
 if __name__ == "__main__":
 
+    import io
+
     print("\nPDF - put example 1")
     print("-------------------")
     m = HashMap(53, hash_function_1)
@@ -509,3 +1332,60 @@ if __name__ == "__main__":
         da = DynamicArray(case)
         mode, frequency = find_mode(da)
         print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}\n")
+
+    print("\nTreeBucket - colliding keys that cannot be ordered")
+    print("--------------------------------------------------")
+
+    class Point:
+        def __init__(self, x: int, y: int) -> None:
+            self.x, self.y = x, y
+
+        def __eq__(self, other) -> bool:
+            return isinstance(other, Point) and (self.x, self.y) == (other.x, other.y)
+
+    # Every key collides, so the bucket becomes a TreeBucket holding points, ints and strings
+    m = HashMap(11, lambda key: 0)
+    keys = [Point(i, -i) for i in range(10)] + list(range(10)) + [str(i) for i in range(10)]
+    for i, key in enumerate(keys):
+        m.put(key, i)
+    print(m.get_size(), m.get(Point(3, -3)), m.get(3), m.get('3'), m.get(Point(3, 3)))
+    for key in keys[::2]:
+        m.remove(key)
+    print(m.get_size(), m.get(Point(3, -3)), m.get(Point(4, -4)), m.contains_key(9))
+
+    print("\nIncremental resize - empty_buckets while old buckets are still being moved")
+    print("--------------------------------------------------------------------------")
+    m = HashMap(11, hash_function_1, migrate_step=1)
+    in_range = True
+    for i in range(60):
+        m.put('str' + str(i), i)
+        if m._old_buckets is not None:
+            in_range = in_range and 0 <= m.empty_buckets() <= m.get_capacity()
+    print(in_range, m.empty_buckets(), m.get_capacity(), m._old_buckets is not None)
+    m._finish_migration()
+    print(m.empty_buckets(), m.get_capacity())
+
+    print("\nPower-of-two capacity - hashes that differ only in their high bits")
+    print("------------------------------------------------------------------")
+    # Every key's hash is a multiple of 2^44; the low bits alone would send them all to one bucket
+    for policy in ('prime', 'power_of_two'):
+        m = HashMap(1024, lambda key: key << 44, capacity_policy=policy)
+        for i in range(1000):
+            m.put(i, i)
+        print(policy, m.get_capacity(), m.get_capacity() - m.empty_buckets(), m.stats()['chain_max'])
+
+    print("\nDump and load - a dump that was cut short")
+    print("-----------------------------------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(20):
+        m.put('str' + str(i), i * 10)
+    dump = io.BytesIO()
+    m.dump(dump)
+    data = dump.getvalue()
+    print(HashMap.load(io.BytesIO(data)).get_size())
+    # Cut inside the header, inside the hash function id, and inside the last record
+    for length in (10, 30, len(data) - 1):
+        try:
+            HashMap.load(io.BytesIO(data[:length]))
+        except ValueError as error:
+            print(length < len(data), 'ValueError:', error)
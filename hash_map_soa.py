@@ -0,0 +1,382 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A compact version of the open addressing HashMap. Instead of a HashEntry
+#              object per bucket, the table is stored as parallel arrays: an array of
+#              cached hashes, a bytearray of bucket states (empty, live or tombstone),
+#              and lists of keys and values. This removes the per-entry object overhead.
+#              Collision resolution is the same quadratic probing as in hash_map_oa.py,
+#              and the interface is the same too.
+
+from array import array
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+
+
+# Bucket states stored in the _states bytearray
+_EMPTY = 0
+_LIVE = 1
+_TOMBSTONE = 2
+
+# Cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+
+class HashMap:
+    def __init__(self, capacity: int, function,
+                 tombstone_threshold: float = 0.25) -> None:
+        """
+        Initialize new HashMap that uses
+        quadratic probing for collision resolution, with the table
+        stored as parallel arrays rather than HashEntry objects.
+        The table is compacted at the same capacity once tombstones
+        make up more than tombstone_threshold of the buckets.
+        """
+        # capacity must be a prime number
+        self._capacity = self._next_prime(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = function
+        self._size = 0
+        self._tombstones = 0
+        self._tombstone_threshold = tombstone_threshold
+
+        # Bumped whenever entries may move to other buckets, so iterators can tell the table changed
+        self._version = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            if self._states[i] == _EMPTY:
+                out += str(i) + ': None\n'
+            else:
+                is_tombstone = self._states[i] == _TOMBSTONE
+                out += f"{i}: K: {self._keys[i]} V: {self._values[i]} TS: {is_tombstone}\n"
+        return out
+
+    def _next_prime(self, capacity: int) -> int:
+        """
+        Increment from given number to find the closest prime number
+        """
+        if capacity % 2 == 0:
+            capacity += 1
+
+        while not self._is_prime(capacity):
+            capacity += 2
+
+        return capacity
+
+    @staticmethod
+    def _is_prime(capacity: int) -> bool:
+        """
+        Determine if given integer is a prime number and return boolean
+        """
+        if capacity == 2 or capacity == 3:
+            return True
+
+        if capacity == 1 or capacity % 2 == 0:
+            return False
+
+        factor = 3
+        while factor ** 2 <= capacity:
+            if capacity % factor == 0:
+                return False
+            factor += 2
+
+        return True
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Creates empty parallel arrays for the given number of buckets.
+        """
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._states = bytearray(capacity)
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+
+    def _find_index(self, key: str, hash: int) -> int:
+        """
+        Returns the bucket index holding the given key, or -1 if the key is not in the table.
+        """
+        capacity = self._capacity
+        states = self._states
+        hashes = self._hashes
+        index = hash % capacity
+        probe = 0
+
+        while probe < capacity:
+            current_index = (index + probe * probe) % capacity
+            state = states[current_index]
+            if state == _EMPTY:
+                return -1
+            # Only live buckets with the same cached hash need a key comparison
+            if state == _LIVE and hashes[current_index] == hash and self._keys[current_index] == key:
+                return current_index
+            probe += 1
+
+        return -1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or inserts a key/value pair into the hash map.
+        If the key is already in the hash map, replace its value.
+        If the key is not in the hash map, add a new entry.
+        """
+        # If adding a new key would cause the load factor to be >= 0.5,
+        # we must first resize the table to double its current capacity.
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        # Tombstones still occupy buckets, so we rebuild to clear them before
+        # quadratic probing could fail to reach an empty bucket
+        elif self.effective_load() >= 0.5:
+            self._rebuild(self._capacity)
+
+        hash = self._hash_function(key) & _HASH_MASK
+        capacity = self._capacity
+        states = self._states
+        index = hash % capacity
+        first_tombstone_index = -1
+
+        probe = 0
+        while probe < capacity:
+            current_index = (index + probe * probe) % capacity
+            state = states[current_index]
+
+            if state == _EMPTY:
+                # Reuse the first tombstone we passed, if any
+                if first_tombstone_index != -1:
+                    current_index = first_tombstone_index
+                    self._tombstones -= 1
+                states[current_index] = _LIVE
+                self._hashes[current_index] = hash
+                self._keys[current_index] = key
+                self._values[current_index] = value
+                self._size += 1
+                self._version += 1
+                return
+
+            elif state == _TOMBSTONE:
+                if first_tombstone_index == -1:
+                    first_tombstone_index = current_index
+
+            elif self._hashes[current_index] == hash and self._keys[current_index] == key:
+                # Key found; update its value
+                self._values[current_index] = value
+                return
+
+            probe += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table. All live key/value pairs
+        are moved into the new table using their cached hashes.
+        """
+        # If new_capacity is less than the current number of elements in the hash map, we do nothing.
+        if new_capacity < self._size:
+            return
+
+        new_capacity = self._next_prime(new_capacity)
+
+        # We grow the target capacity up front exactly as put() would have while re-inserting
+        count = 0
+        while count < self._size:
+            if count / new_capacity >= 0.5:
+                new_capacity = self._next_prime(new_capacity * 2)
+            count += 1
+
+        self._rebuild(new_capacity)
+
+    def _rebuild(self, new_capacity: int) -> None:
+        """
+        Moves every live key/value pair into fresh arrays with new_capacity buckets,
+        dropping all tombstones.
+        """
+        old_hashes = self._hashes
+        old_states = self._states
+        old_keys = self._keys
+        old_values = self._values
+        old_capacity = self._capacity
+
+        self._allocate(new_capacity)
+        self._capacity = new_capacity
+        self._tombstones = 0
+        self._version += 1
+
+        states = self._states
+        index = 0
+        while index < old_capacity:
+            if old_states[index] == _LIVE:
+                hash = old_hashes[index]
+                home = hash % new_capacity
+                current_index = home
+                probe = 0
+
+                # The new arrays hold no tombstones or duplicates, so we just find the first empty bucket
+                while states[current_index] != _EMPTY:
+                    probe += 1
+                    current_index = (home + probe * probe) % new_capacity
+
+                states[current_index] = _LIVE
+                self._hashes[current_index] = hash
+                self._keys[current_index] = old_keys[index]
+                self._values[current_index] = old_values[index]
+            index += 1
+
+    def table_load(self) -> float:
+        """
+        Returns the current load factor of the hash table
+        """
+        return self._size / self._capacity
+
+    def effective_load(self) -> float:
+        """
+        Returns the fraction of buckets that are occupied by either a live entry or a tombstone.
+        """
+        return (self._size + self._tombstones) / self._capacity
+
+    def tombstone_buckets(self) -> int:
+        """
+        Returns the number of buckets holding a tombstone.
+        """
+        return self._tombstones
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table.
+        Tombstones are not counted here; see tombstone_buckets().
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None.
+        """
+        index = self._find_index(key, self._hash_function(key) & _HASH_MASK)
+        if index == -1:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the hash map, otherwise returns False.
+        """
+        return self._find_index(key, self._hash_function(key) & _HASH_MASK) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, this method does nothing.
+        """
+        index = self._find_index(key, self._hash_function(key) & _HASH_MASK)
+        if index == -1:
+            return
+
+        # The bucket becomes a tombstone; we drop the references so the key and value can be freed
+        self._states[index] = _TOMBSTONE
+        self._keys[index] = None
+        self._values[index] = None
+        self._size -= 1
+        self._tombstones += 1
+        self._version += 1
+
+        # Once tombstones make up too much of the table we rebuild it at the same capacity
+        if self._tombstones > self._tombstone_threshold * self._capacity:
+            self._rebuild(self._capacity)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a dynamic array where each index contains a tuple (key, value)
+        for each live key/value pair stored in the hash map.
+        """
+        new_dynamic_array = DynamicArray()
+        index = 0
+        while index < self._capacity:
+            if self._states[index] == _LIVE:
+                new_dynamic_array.append((self._keys[index], self._values[index]))
+            index += 1
+        return new_dynamic_array
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map without changing the underlying capacity.
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+        self._tombstones = 0
+        self._version += 1
+
+    def __iter__(self):
+        """
+        Returns a new iterator over the live entries of the hash map.
+        There are no stored HashEntry objects, so one is built for each live bucket.
+        Each call has its own position, so several iterations can run at once.
+        Raises RuntimeError if a key is added or removed while iterating.
+        """
+        version = self._version
+        states = self._states
+        hashes = self._hashes
+        keys = self._keys
+        values = self._values
+
+        # The position lives in this generator rather than on the map
+        index = 0
+        while index < self._capacity:
+            if states[index] == _LIVE:
+                yield HashEntry(keys[index], values[index], hashes[index])
+                if self._version != version:
+                    raise RuntimeError("HashMap changed size during iteration")
+            index += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nCompact layout - put example")
+    print("----------------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nCompact layout - remove and iterate")
+    print("-----------------------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
+
+    print("\nCompact layout - nested iteration and changes while iterating")
+    print("-------------------------------------------------------------")
+    # Every iteration has its own position, so the inner loop does not end the outer one
+    pairs = [(outer.key, inner.key) for outer in m for inner in m]
+    print(len(pairs), m.get_size() ** 2)
+    try:
+        for item in m:
+            m.put(item.key + '!', 0)
+    except RuntimeError as error:
+        print('RuntimeError:', error)
@@ -0,0 +1,346 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: A HashMap front-end that partitions keys across worker processes. Every
+#              shard process owns an ordinary separate chaining or open addressing HashMap,
+#              and keys are routed to a shard by their hash. Requests travel over one pipe
+#              per shard; single puts are buffered per shard and sent in batches, and
+#              whole-map operations (get_keys_and_values, find_mode) are sent to every
+#              shard at once and their partial results merged, so the shards work in parallel.
+
+import multiprocessing
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+
+
+def _handle_request(hash_map, command: str, argument: object) -> object:
+    """
+    Applies one request to a shard's HashMap and returns the reply to send back.
+    """
+    if command == 'put_many':
+        hash_map.put_many(argument)
+        return None
+    if command == 'get_many':
+        values = hash_map.get_many(argument)
+        return [values[index] for index in range(values.length())]
+    if command == 'remove_many':
+        hash_map.remove_many(argument)
+        return None
+    if command == 'get_keys_and_values':
+        pairs = hash_map.get_keys_and_values()
+        return [pairs[index] for index in range(pairs.length())]
+    if command == 'find_mode':
+        modes, frequency = hash_map_sc.find_mode(DynamicArray(argument))
+        return [modes[index] for index in range(modes.length())], frequency
+    if command == 'size':
+        return hash_map.get_size()
+    if command == 'clear':
+        hash_map.clear()
+        return None
+    raise ValueError(f"unknown shard command {command!r}")
+
+
+def _shard_main(connection, map_type: str, capacity: int, function) -> None:
+    """
+    Runs in each shard process: applies the requests arriving on the connection
+    to the shard's own HashMap and sends back one (error, reply) pair per request.
+    An exception is sent back as the error instead of ending the shard, and the
+    front-end raises it again for the request that caused it.
+    """
+    if map_type == 'sc':
+        hash_map = hash_map_sc.HashMap(capacity, function)
+    else:
+        hash_map = hash_map_oa.HashMap(capacity, function)
+
+    while True:
+        try:
+            # Unpickling the request runs here too, so it can fail as well
+            command, argument = connection.recv()
+            if command == 'close':
+                connection.send((None, None))
+                connection.close()
+                return
+            reply = _handle_request(hash_map, command, argument)
+        except EOFError:
+            # The front-end went away without closing the map
+            return
+        except Exception as error:
+            try:
+                connection.send((error, None))
+            except Exception:
+                # The exception itself could not be pickled, so we describe it instead
+                connection.send((RuntimeError(f"{type(error).__name__}: {error}"), None))
+            continue
+
+        connection.send((None, reply))
+
+
+class ShardedHashMap:
+    def __init__(self,
+                 shards: int = 4,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 map_type: str = 'sc',
+                 batch_size: int = 1024) -> None:
+        """
+        Initialize a HashMap front-end backed by the given number of shard processes.
+        map_type selects the HashMap each shard holds: 'sc' (separate chaining)
+        or 'oa' (open addressing); capacity is the initial capacity of each shard.
+        Single put() calls are buffered and sent once batch_size of them are
+        pending for a shard. The hash function must be picklable (e.g. defined
+        at module level) so it can be sent to the shard processes.
+        """
+        if map_type not in ('sc', 'oa'):
+            raise ValueError("map_type must be 'sc' or 'oa'")
+
+        self._hash_function = function
+        self._batch_size = batch_size
+        self._connections = []
+        self._processes = []
+        self._pending = [[] for _ in range(shards)]
+
+        for _ in range(shards):
+            parent_end, child_end = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_main,
+                                              args=(child_end, map_type, capacity, function),
+                                              daemon=True)
+            process.start()
+            child_end.close()
+            self._connections.append(parent_end)
+            self._processes.append(process)
+
+    def __enter__(self) -> "ShardedHashMap":
+        """Use the map in a with statement so the shards are always shut down."""
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        """Shut down the shards when leaving the with statement."""
+        self.close()
+
+    # ------------------------------------------------------------------ #
+
+    def _shard(self, key: str) -> int:
+        """
+        Returns the index of the shard that owns the given key.
+        """
+        return self._hash_function(key) % len(self._connections)
+
+    def _receive(self, shard: int) -> tuple:
+        """
+        Returns the (error, reply) pair the given shard sent for its last request.
+        """
+        return self._connections[shard].recv()
+
+    def _request(self, shard: int, request: tuple) -> object:
+        """
+        Sends one (command, argument) request to the given shard and returns its reply.
+        Raises the exception the shard ran into, if any.
+        """
+        self._connections[shard].send(request)
+        error, reply = self._receive(shard)
+        if error is not None:
+            raise error
+        return reply
+
+    def _request_all(self, requests: list) -> list:
+        """
+        Sends requests[i] (a (command, argument) pair, or None to skip) to shard i,
+        then collects the replies; the shards work on their requests in parallel.
+        Every reply is collected before the first exception a shard ran into is raised,
+        so no reply is left in a pipe to be mistaken for the answer to a later request.
+        """
+        for shard, request in enumerate(requests):
+            if request is not None:
+                self._connections[shard].send(request)
+        replies = [None] * len(requests)
+        first_error = None
+        for shard, request in enumerate(requests):
+            if request is not None:
+                error, replies[shard] = self._receive(shard)
+                if first_error is None:
+                    first_error = error
+        if first_error is not None:
+            raise first_error
+        return replies
+
+    def _flush(self, shard: int = None) -> None:
+        """
+        Sends the buffered puts of one shard, or of every shard if shard is None.
+        """
+        requests = [None] * len(self._connections)
+        for index, pending in enumerate(self._pending):
+            if pending and (shard is None or shard == index):
+                requests[index] = ('put_many', pending)
+                self._pending[index] = []
+        self._request_all(requests)
+
+    def _partition(self, keys: list) -> tuple:
+        """
+        Splits keys by shard. Returns (keys per shard, shard of each key, position of
+        each key within its shard's list) so results can be put back in order.
+        """
+        per_shard = [[] for _ in self._connections]
+        shards = []
+        positions = []
+        for key in keys:
+            shard = self._shard(key)
+            shards.append(shard)
+            positions.append(len(per_shard[shard]))
+            per_shard[shard].append(key)
+        return per_shard, shards, positions
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates or inserts a key/value pair. The write is buffered and sent to its
+        shard in a batch; any later read of that shard sends it first.
+        """
+        shard = self._shard(key)
+        self._pending[shard].append((key, value))
+        if len(self._pending[shard]) >= self._batch_size:
+            self._flush(shard)
+
+    def put_many(self, pairs) -> None:
+        """
+        Updates or inserts every (key, value) pair, sending one batch per shard.
+        """
+        for key, value in pairs:
+            self._pending[self._shard(key)].append((key, value))
+        self._flush()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key, or None if it is not in the map.
+        """
+        shard = self._shard(key)
+        self._flush(shard)
+        return self._request(shard, ('get_many', [key]))[0]
+
+    def get_many(self, keys) -> DynamicArray:
+        """
+        Returns a DynamicArray with the value of each key (None if missing), in order.
+        All shards look up their part of the keys in parallel.
+        """
+        self._flush()
+        keys = list(keys)
+        per_shard, shards, positions = self._partition(keys)
+        replies = self._request_all([('get_many', part) if part else None for part in per_shard])
+        return DynamicArray([replies[shard][position] for shard, position in zip(shards, positions)])
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns True if the given key is in the map, otherwise False.
+        """
+        return self.get(key) is not None
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key from the map; does nothing if it is not there.
+        """
+        self.remove_many([key])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes each of the given keys; keys that are not present are ignored.
+        """
+        self._flush()
+        per_shard, _, _ = self._partition(list(keys))
+        self._request_all([('remove_many', part) if part else None for part in per_shard])
+
+    def get_size(self) -> int:
+        """
+        Returns the total number of keys across all shards.
+        """
+        self._flush()
+        return sum(self._request_all([('size', None)] * len(self._connections)))
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a DynamicArray of (key, value) tuples gathered from every shard.
+        """
+        self._flush()
+        result = DynamicArray()
+        for pairs in self._request_all([('get_keys_and_values', None)] * len(self._connections)):
+            for pair in pairs:
+                result.append(pair)
+        return result
+
+    def find_mode(self, arr: DynamicArray) -> tuple:
+        """
+        The same modes and frequency as hash_map_sc.find_mode(arr), computed by the shards
+        in parallel; the modes are grouped by shard, so their order is unspecified.
+        Equal values always go to the same shard, so every shard's count is exact
+        for its values and the overall modes are the shard modes with the highest frequency.
+        """
+        values = [arr.get_at_index(index) for index in range(arr.length())]
+        per_shard, _, _ = self._partition(values)
+        replies = self._request_all([('find_mode', part) if part else None for part in per_shard])
+
+        highest_frequency = max((reply[1] for reply in replies if reply is not None), default=0)
+        modes = DynamicArray()
+        for reply in replies:
+            if reply is not None and reply[1] == highest_frequency:
+                for value in reply[0]:
+                    modes.append(value)
+        return modes, highest_frequency
+
+    def clear(self) -> None:
+        """
+        Removes every key from every shard, including buffered puts.
+        """
+        self._pending = [[] for _ in self._connections]
+        self._request_all([('clear', None)] * len(self._connections))
+
+    def close(self) -> None:
+        """
+        Sends buffered puts, then stops every shard process. The map can't be used afterwards.
+        """
+        if not self._processes:
+            return
+        self._flush()
+        self._request_all([('close', None)] * len(self._connections))
+        for connection in self._connections:
+            connection.close()
+        for process in self._processes:
+            process.join()
+        self._connections = []
+        self._processes = []
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nSharded - put and get across 4 shards")
+    print("-------------------------------------")
+    with ShardedHashMap(4, 53, hash_function_2) as m:
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        print(m.get_size(), m.get('str7'), m.get('missing'))
+        values = m.get_many(['str' + str(i) for i in range(5)])
+        print(values)
+        m.remove('str7')
+        print(m.get_size(), m.contains_key('str7'))
+
+    print("\nSharded - find_mode")
+    print("-------------------")
+    with ShardedHashMap(3, 11, hash_function_1, map_type='oa') as m:
+        da = DynamicArray(["2", "4", "2", "6", "8", "4", "1", "3", "4", "5", "7", "3", "3", "2"])
+        mode, frequency = m.find_mode(da)
+        print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}")
+
+    print("\nSharded - an error in a shard is raised by the front-end")
+    print("--------------------------------------------------------")
+
+    class Unloadable:
+        # Pickles fine, but unpickling it in the shard raises ValueError
+        def __reduce__(self):
+            return int, ('not a number',)
+
+    with ShardedHashMap(2, 11, hash_function_2) as m:
+        m.put_many([('str' + str(i), i) for i in range(10)])
+        try:
+            m.put_many([('bad', Unloadable())])
+        except ValueError as error:
+            print('ValueError:', error)
+        print(m.get_size(), m.get('str3'), m.get('bad'))